@@ -0,0 +1,404 @@
+"""
+Move search for the computer player.
+Negamax alpha-beta with iterative deepening, a bounded transposition table keyed on GameState.zobrist_key
+and move ordering by hash move, MVV-LVA for captures, killer moves and the history heuristic.
+Inner nodes take their moves from getStagedMoveCodes, so a cutoff on the hash move or a capture skips generating
+the quiet moves. The search only uses packed move ints, so it works with any GameState backend and only builds
+Move objects for the principal variation it reports.
+On top of that: a capture-only quiescence search with stand-pat and delta pruning at the leaves, null move pruning,
+late move reductions, check extensions and aspiration windows, each of which can be switched off (see FEATURES and
+ChessBench for comparing them).
+"""
+
+import time
+
+from ChessEngine import Move, CODE_PIECES, CODE_VALUES, PROMOTION_GAINS, FIFTY_MOVE_PLIES, NULL_MOVE
+from ChessEvaluation import evaluate
+
+
+CHECKMATE = 100000
+STALEMATE = 0
+DRAW = 0
+MAX_PLY = 128
+
+# Searcher keyword arguments switching the search features on and off
+FEATURES = ("quiescence", "delta_pruning", "null_move", "late_move_reductions", "check_extensions", "aspiration_windows")
+DELTA_MARGIN = 200 # a capture must be able to come this close to alpha to be searched in quiescence
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3 # moves searched at full depth before reducing
+ASPIRATION_WINDOW = 50
+ASPIRATION_MIN_DEPTH = 3
+
+# transposition table entry flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class SearchAborted(Exception):
+    pass
+
+
+"""
+Progress and result of a search.
+"""
+
+
+class SearchInfo():
+    def __init__(self):
+        self.depth = 0
+        self.score = 0
+        self.nodes = 0
+        self.seconds = 0.0
+        self.nps = 0
+        self.pv = [] # principal variation, list of Move objects
+        self.best_move = None
+
+
+    def __str__(self):
+        return "depth %d score %d nodes %d nps %d time %.3fs pv %s" % (
+            self.depth, self.score, self.nodes, self.nps, self.seconds,
+            " ".join(move.getChessNotation() for move in self.pv))
+
+
+"""
+Mate scores count plies from the root, the transposition table stores them relative to the node instead
+so an entry is still correct when the position is reached at a different ply.
+"""
+
+
+def scoreToTable(score, ply):
+    if score >= CHECKMATE - MAX_PLY:
+        return score + ply
+    if score <= -CHECKMATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    if score >= CHECKMATE - MAX_PLY:
+        return score - ply
+    if score <= -CHECKMATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+class Searcher():
+    def __init__(self, table_size=1 << 18, staged_moves=True, quiescence=True, delta_pruning=True, null_move=True,
+                 late_move_reductions=True, check_extensions=True, aspiration_windows=True):
+        # the transposition table is a fixed size list indexed by the low bits of the zobrist key,
+        # entries are (key, depth, score, flag, best move) and are always replaced
+        self.table_size = table_size
+        self.transposition_table = [None] * table_size
+        self.stop_requested = False
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+        self.history = [0] * (len(CODE_PIECES) * 64) # indexed by piece moved * 64 + end square
+        self.staged_moves = staged_moves # False generates and sorts every move list up front, for comparison
+        self.quiescence = quiescence
+        self.delta_pruning = delta_pruning
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.check_extensions = check_extensions
+        self.aspiration_windows = aspiration_windows
+
+
+    def clear(self):
+        self.transposition_table = [None] * self.table_size
+        self.history = [0] * (len(CODE_PIECES) * 64)
+
+
+    """
+    Ask a running search to return as soon as possible (can be called from another thread).
+    A stop that arrives just before a search starts still stops it, the request is cleared when a search ends.
+    """
+
+
+    def stop(self):
+        self.stop_requested = True
+
+
+    """
+    Iterative deepening search. Stops at max_depth, after time_limit seconds or after node_limit nodes,
+    whichever comes first, and returns a SearchInfo for the last completed iteration.
+    callback(info) is called after every completed iteration.
+    """
+
+
+    def search(self, game_state, max_depth=MAX_PLY, time_limit=None, node_limit=None, callback=None):
+        start = time.perf_counter()
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+        checkmate, stalemate, draw, draw_reason = game_state.checkmate, game_state.stalemate, game_state.draw, game_state.draw_reason
+
+        root_length = len(game_state.move_log)
+        info = SearchInfo()
+        root_moves = game_state.getValidMoveCodes()
+        if len(root_moves) > 0:
+            info.best_move = Move.fromCode(root_moves[0]) # something to play even if the first iteration is cut short
+        for depth in range(1, min(max_depth, MAX_PLY - 1) + 1):
+            try:
+                score = self.searchRoot(game_state, depth, info.score)
+            except SearchAborted:
+                # unwind to the root position, the aborted iteration is thrown away
+                while len(game_state.move_log) > root_length:
+                    game_state.undoMove()
+                break
+            info.depth = depth
+            info.score = score
+            info.pv = self.principalVariation(game_state, depth)
+            if len(info.pv) > 0:
+                info.best_move = info.pv[0]
+            info.nodes = self.nodes
+            info.seconds = time.perf_counter() - start
+            info.nps = int(self.nodes / info.seconds) if info.seconds > 0 else 0
+            if callback is not None:
+                callback(info)
+            if abs(score) >= CHECKMATE - MAX_PLY: # found a forced mate, deeper search won't change it
+                break
+
+        info.nodes = self.nodes
+        info.seconds = time.perf_counter() - start
+        info.nps = int(self.nodes / info.seconds) if info.seconds > 0 else 0
+        game_state.checkmate, game_state.stalemate, game_state.draw, game_state.draw_reason = checkmate, stalemate, draw, draw_reason
+        self.stop_requested = False
+        return info
+
+
+    """
+    Search the root to depth. With aspiration windows the search starts with a narrow window around the score of the
+    previous iteration and widens it on the side that failed until the score falls inside.
+    """
+
+
+    def searchRoot(self, game_state, depth, previous_score):
+        if not self.aspiration_windows or depth < ASPIRATION_MIN_DEPTH or abs(previous_score) >= CHECKMATE - MAX_PLY:
+            return self.negamax(game_state, depth, -CHECKMATE - 1, CHECKMATE + 1, 0)
+        low = high = ASPIRATION_WINDOW
+        while True:
+            alpha = previous_score - low if low < CHECKMATE else -CHECKMATE - 1
+            beta = previous_score + high if high < CHECKMATE else CHECKMATE + 1
+            score = self.negamax(game_state, depth, alpha, beta, 0)
+            if score <= alpha and alpha > -CHECKMATE - 1:
+                low *= 4
+            elif score >= beta and beta < CHECKMATE + 1:
+                high *= 4
+            else:
+                return score
+
+
+    def checkLimits(self):
+        if self.stop_requested:
+            raise SearchAborted()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+
+
+    def negamax(self, game_state, depth, alpha, beta, ply):
+        self.nodes += 1
+        self.checkLimits()
+
+        key = game_state.zobrist_key
+        # a position seen before in the game or on the current line is scored as a draw, the side that could
+        # deviate will, so there's no need to wait for the third occurrence
+        if ply > 0 and (game_state.repetition_counts.get(key, 0) >= 2 or game_state.halfmove_clock >= FIFTY_MOVE_PLIES):
+            return DRAW
+        if ply >= MAX_PLY - 1:
+            return evaluate(game_state)
+
+        in_check = (self.check_extensions or self.null_move or self.late_move_reductions) and game_state.inCheck()
+        if in_check and self.check_extensions:
+            depth += 1
+
+        entry = self.transposition_table[key % self.table_size]
+        hash_move = None
+        if entry is not None and entry[0] == key:
+            hash_move = entry[4]
+            if ply > 0 and entry[1] >= depth:
+                score = scoreFromTable(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER_BOUND and score >= beta:
+                    return score
+                if entry[3] == UPPER_BOUND and score <= alpha:
+                    return score
+
+        if depth <= 0:
+            return self.quiesce(game_state, alpha, beta, ply) if self.quiescence else evaluate(game_state)
+
+        # null move pruning: if passing still fails high at a reduced depth, a real move would too. Not done in check,
+        # twice in a row or without pieces other than pawns, where passing might be the best move (zugzwang)
+        if self.null_move and ply > 0 and not in_check and depth >= NULL_MOVE_MIN_DEPTH and abs(beta) < CHECKMATE - MAX_PLY \
+                and game_state.move_log[-1] != NULL_MOVE and evaluate(game_state) >= beta and hasPieces(game_state):
+            game_state.makeNullMove()
+            score = -self.negamax(game_state, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1)
+            game_state.undoMove()
+            if score >= beta:
+                return beta
+
+        if self.staged_moves:
+            moves = game_state.getStagedMoveCodes(hash_move, self.killers[ply], self.history)
+        else:
+            moves = game_state.getValidMoveCodes()
+            self.orderMoves(moves, hash_move, ply)
+        original_alpha = alpha
+        best_score = -CHECKMATE - 1
+        best_move = None
+        searched = 0
+        for move in moves:
+            game_state.makeMove(move)
+            searched += 1
+            # late move reductions: quiet moves ordered late rarely matter, search them shallower with a null window
+            # and only search them again at full depth if they beat alpha after all. Root moves are never reduced
+            if self.late_move_reductions and ply > 0 and searched > LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH and not in_check \
+                    and not (move >> 21) & 15 and not (move >> 14) & 7 and not game_state.inCheck():
+                reduction = 2 if searched > 2 * LMR_MIN_MOVES and depth >= 2 * LMR_MIN_DEPTH else 1
+                score = -self.negamax(game_state, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                if score > alpha:
+                    score = -self.negamax(game_state, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self.negamax(game_state, depth - 1, -beta, -alpha, ply + 1)
+            game_state.undoMove()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not (move >> 21) & 15: # quiet move caused the cutoff
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[((move >> 17) & 15) * 64 + ((move >> 6) & 63)] += depth * depth
+                break
+        if best_move is None: # no legal moves, in_check was set for this position before any move was made
+            return -CHECKMATE + ply if game_state.in_check else STALEMATE
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transposition_table[key % self.table_size] = (key, depth, scoreToTable(best_score, ply), flag, best_move)
+        return best_score
+
+
+    """
+    Quiescence search: only captures and promotions are searched so the static evaluation is never taken in the middle
+    of an exchange. The side to move may stand pat on the evaluation instead of capturing. Delta pruning skips captures
+    that can't bring the score back up to alpha even with DELTA_MARGIN to spare. In check every evasion is searched.
+    """
+
+
+    def quiesce(self, game_state, alpha, beta, ply):
+        self.nodes += 1
+        self.checkLimits()
+        if ply >= MAX_PLY - 1:
+            return evaluate(game_state)
+
+        in_check = game_state.inCheck()
+        if in_check:
+            best_score = -CHECKMATE + ply # mated unless an evasion is found
+            moves = game_state.getStagedMoveCodes()
+        else:
+            best_score = evaluate(game_state)
+            if best_score >= beta:
+                return best_score
+            if best_score > alpha:
+                alpha = best_score
+            moves = game_state.getStagedMoveCodes(quiets=False)
+        for move in moves:
+            if self.delta_pruning and not in_check and best_score + CODE_VALUES[(move >> 21) & 15] + PROMOTION_GAINS[(move >> 14) & 7] + DELTA_MARGIN <= alpha:
+                continue
+            game_state.makeMove(move)
+            score = -self.quiesce(game_state, -beta, -alpha, ply + 1)
+            game_state.undoMove()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+    """
+    Sort moves in place: hash move, captures by MVV-LVA (most valuable victim, least valuable attacker), killers, then history.
+    """
+
+
+    def orderMoves(self, moves, hash_move, ply):
+        killers = self.killers[ply]
+        history = self.history
+
+        def moveScore(move):
+            if move == hash_move:
+                return 1 << 30
+            captured = (move >> 21) & 15
+            if captured:
+                return (1 << 28) + CODE_VALUES[captured] * 16 - CODE_VALUES[(move >> 17) & 15] // 16
+            if (move >> 14) & 7 == 1: # queen promotion, under promotions are scored like quiet moves
+                return (1 << 28) - 1
+            if move == killers[0]:
+                return 1 << 27
+            if move == killers[1]:
+                return (1 << 27) - 1
+            return history[((move >> 17) & 15) * 64 + ((move >> 6) & 63)]
+
+        moves.sort(key=moveScore, reverse=True)
+
+
+    """
+    Follow the best moves stored in the transposition table from the current position.
+    """
+
+
+    def principalVariation(self, game_state, depth):
+        pv = []
+        seen = set()
+        for i in range(depth):
+            key = game_state.zobrist_key
+            entry = self.transposition_table[key % self.table_size]
+            if entry is None or entry[0] != key or key in seen:
+                break
+            seen.add(key)
+            if entry[4] not in game_state.getValidMoveCodes():
+                break
+            game_state.makeMove(entry[4])
+            pv.append(Move.fromCode(entry[4]))
+        for move in pv:
+            game_state.undoMove()
+        return pv
+
+
+"""
+Whether the side to move has a piece other than pawns and the king.
+"""
+
+
+def hasPieces(game_state):
+    color = "w" if game_state.white_to_move else "b"
+    for row in game_state.board:
+        for piece in row:
+            if piece[0] == color and piece[1] != "P" and piece[1] != "K":
+                return True
+    return False
+
+
+"""
+Convenience wrapper for a one-off search, returns the best move (or None if there are no legal moves).
+"""
+
+
+def findBestMove(game_state, max_depth=MAX_PLY, time_limit=None, node_limit=None):
+    return Searcher().search(game_state, max_depth, time_limit, node_limit).best_move
@@ -0,0 +1,149 @@
+"""
+Search benchmark: time-to-depth and nodes-to-depth of the Searcher on a fixed suite of positions,
+for several combinations of the search features (see ChessAI.FEATURES).
+A configuration is "all" (the defaults), "none" (plain alpha-beta with move ordering), "no-feature" (all but one)
+or "only-feature" (none but one). Every position is searched with a fresh Searcher, so the runs are independent.
+
+Usage (from the repository root):
+    python Chess/ChessBench.py --depth 4
+    python Chess/ChessBench.py --backend bitboard --depth 5 --configs none all no-null_move no-late_move_reductions
+    python Chess/ChessBench.py --depth 5 --save run.json
+    python Chess/ChessBench.py --depth 5 --compare run.json
+"""
+
+import argparse
+import json
+import sys
+
+import ChessAI
+import ChessPerft
+
+
+# (name, FEN): quiet openings and middlegames plus positions with captures, checks and mates in the air
+POSITIONS = [
+    ("startpos", ChessPerft.START_FEN),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"),
+    ("italian", "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQK2R b KQkq - 0 5"),
+    ("queens-gambit", "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 9"),
+    ("scholars-mate", "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"),
+    ("back-rank", "6k1/5ppp/8/8/8/8/r4PPP/3R2K1 w - - 0 1"),
+    ("wac-001", "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1"),
+    ("wac-002", "8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/8 b - - 0 1"),
+    ("rook-endgame", "8/5k2/8/3R4/8/2r5/5PK1/8 w - - 0 1"),
+]
+
+
+"""
+Searcher keyword arguments for a configuration name, raises ValueError for an unknown name.
+"""
+
+
+def configFeatures(config):
+    if config == "all":
+        return {feature: True for feature in ChessAI.FEATURES}
+    if config == "none":
+        return {feature: False for feature in ChessAI.FEATURES}
+    switch, _, feature = config.partition("-")
+    if switch in ("no", "only") and feature in ChessAI.FEATURES:
+        features = configFeatures("all" if switch == "no" else "none")
+        features[feature] = switch == "only"
+        return features
+    raise ValueError("unknown configuration %s, use all, none, no-feature or only-feature with a feature from %s"
+                     % (config, ", ".join(ChessAI.FEATURES)))
+
+
+"""
+Search one position to depth with a fresh Searcher.
+Returns a result dict with the nodes and seconds it took to complete every depth and the final move and score.
+"""
+
+
+def runPosition(backend, name, fen, depth, config):
+    game_state = ChessPerft.BACKENDS[backend]()
+    game_state.loadFen(fen)
+    searcher = ChessAI.Searcher(**configFeatures(config))
+    iterations = []
+    info = searcher.search(game_state, depth, callback=lambda info: iterations.append((info.depth, info.nodes, info.seconds)))
+    return {
+        "backend": backend,
+        "config": config,
+        "position": name,
+        "depth": info.depth,
+        "nodes": info.nodes,
+        "seconds": info.seconds,
+        "score": info.score,
+        "best_move": info.best_move.getUciNotation() if info.best_move is not None else None,
+        "nodes_to_depth": [nodes for depth, nodes, seconds in iterations],
+        "seconds_to_depth": [seconds for depth, nodes, seconds in iterations],
+    }
+
+
+def printResult(result, previous=None):
+    line = "%-9s %-24s %-16s depth %d  nodes %9d  %8.3fs  %-6s %6d" % (
+        result["backend"], result["config"], result["position"], result["depth"], result["nodes"], result["seconds"],
+        result["best_move"], result["score"])
+    if previous is not None and previous["seconds"] > 0:
+        line += "  %+.1f%% time %+.1f%% nodes vs previous" % ((result["seconds"] / previous["seconds"] - 1) * 100,
+                                                            (result["nodes"] / max(previous["nodes"], 1) - 1) * 100)
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time-to-depth and nodes-to-depth benchmark for the search features.")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--backend", choices=sorted(ChessPerft.BACKENDS), default="string")
+    parser.add_argument("--position", action="append", help="run only the named position(s) from the suite")
+    parser.add_argument("--configs", nargs="+", default=["only-quiescence", "all"] + ["no-" + feature for feature in ChessAI.FEATURES],
+                        help="feature configurations to compare, the first one is the reference "
+                             "(default: quiescence only, all and all but each feature)")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary per configuration")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare against results saved earlier with --save")
+    args = parser.parse_args(argv)
+
+    positions = [position for position in POSITIONS if not args.position or position[0] in args.position]
+    if not positions:
+        parser.error("unknown position, choose from: " + ", ".join(position[0] for position in POSITIONS))
+    for config in args.configs:
+        try:
+            configFeatures(config)
+        except ValueError as error:
+            parser.error(str(error))
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as file:
+            for result in json.load(file):
+                previous[(result["backend"], result["config"], result["position"], result["depth"])] = result
+
+    all_results = []
+    totals = []
+    for config in args.configs:
+        nodes = 0
+        seconds = 0.0
+        for name, fen in positions:
+            result = runPosition(args.backend, name, fen, args.depth, config)
+            if not args.quiet:
+                printResult(result, previous.get((args.backend, config, name, result["depth"])))
+            all_results.append(result)
+            nodes += result["nodes"]
+            seconds += result["seconds"]
+        totals.append((config, nodes, seconds))
+
+    base_config, base_nodes, base_seconds = totals[0]
+    print("%s, depth %d, %d positions, relative to %s:" % (args.backend, args.depth, len(positions), base_config))
+    for config, nodes, seconds in totals:
+        print("  %-24s nodes %10d (%6.1f%%)  time %8.3fs (%6.1f%%)" % (
+            config, nodes, nodes * 100 / max(base_nodes, 1), seconds, seconds * 100 / base_seconds if base_seconds > 0 else 0.0))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(all_results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
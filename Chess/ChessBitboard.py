@@ -0,0 +1,625 @@
+"""
+Bitboard backed alternative to ChessEngine.GameState.
+The position is kept as one 64-bit integer per piece type and color, square index is row * 8 + col
+(so square 0 is a8 and square 63 is h1, the same orientation as GameState.board).
+Knight, king and pawn attacks are looked up in precomputed tables and sliding pieces use precomputed rays.
+Both backends derive from ChessEngine.BaseGameState, so the public API (getValidMoves, getValidMoveCodes, makeMove,
+undoMove, board, move_log, ...) is the same and the UI and other callers can use either backend.
+"""
+
+from ChessEngine import BaseGameState, insufficientMaterial, encodeMove, CODE_PIECES, PIECE_CODES, MOVE_ENPASSANT, \
+    MOVE_CASTLE, PROMOTION_PIECES, appendPawnMove
+
+
+WHITE = 0
+BLACK = 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECES = ["wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK"]
+PIECE_INDEX = {piece: i for i, piece in enumerate(PIECES)}   # "wP" -> 0 ... "bK" -> 11
+FULL = (1 << 64) - 1
+
+# same direction order as GameState.checkForPinsAndChecks: first 4 orthogonal, last 4 diagonal
+DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+POSITIVE_DIRECTION = tuple(d[0] * 8 + d[1] > 0 for d in DIRECTIONS)  # rays going towards higher square indexes
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+
+
+"""
+Precompute the attack tables once on import.
+"""
+
+
+def _leaperAttacks(offsets):
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        attacks = 0
+        for d_row, d_col in offsets:
+            end_row = row + d_row
+            end_col = col + d_col
+            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
+                attacks |= 1 << (end_row * 8 + end_col)
+        table.append(attacks)
+    return table
+
+
+def _rays():
+    rays = []
+    for d_row, d_col in DIRECTIONS:
+        table = []
+        for square in range(64):
+            row, col = divmod(square, 8)
+            ray = 0
+            for i in range(1, 8):
+                end_row = row + d_row * i
+                end_col = col + d_col * i
+                if not (0 <= end_row <= 7 and 0 <= end_col <= 7):
+                    break
+                ray |= 1 << (end_row * 8 + end_col)
+            table.append(ray)
+        rays.append(table)
+    return rays
+
+
+KNIGHT_ATTACKS = _leaperAttacks(KNIGHT_OFFSETS)
+KING_ATTACKS = _leaperAttacks(DIRECTIONS)
+PAWN_ATTACKS = [_leaperAttacks(((-1, -1), (-1, 1))), _leaperAttacks(((1, -1), (1, 1)))]  # [WHITE], [BLACK]
+RAYS = _rays()
+
+# BETWEEN[a][b] - squares strictly between a and b, LINE[a][b] - the full line through a and b (0 if not aligned)
+BETWEEN = [[0] * 64 for _ in range(64)]
+LINE = [[0] * 64 for _ in range(64)]
+for _square in range(64):
+    for _d in range(8):
+        _opposite = _d ^ 2 if _d < 4 else 11 - _d  # (-1,0)<->(1,0), (0,-1)<->(0,1), (-1,-1)<->(1,1), (-1,1)<->(1,-1)
+        _line = RAYS[_d][_square] | RAYS[_opposite][_square] | (1 << _square)
+        _ray = RAYS[_d][_square]
+        while _ray:
+            _bit = _ray & -_ray
+            _target = _bit.bit_length() - 1
+            _ray ^= _bit
+            BETWEEN[_square][_target] = RAYS[_d][_square] ^ RAYS[_d][_target] ^ (1 << _target)
+            LINE[_square][_target] = _line
+
+
+def slidingAttacks(square, occupied, directions):
+    attacks = 0
+    for d in directions:
+        ray = RAYS[d][square]
+        blockers = ray & occupied
+        if blockers:
+            if POSITIVE_DIRECTION[d]:
+                blocker = (blockers & -blockers).bit_length() - 1  # nearest blocker is the lowest bit
+            else:
+                blocker = blockers.bit_length() - 1  # nearest blocker is the highest bit
+            ray ^= RAYS[d][blocker]
+        attacks |= ray
+    return attacks
+
+
+def rookAttacks(square, occupied):
+    return slidingAttacks(square, occupied, ROOK_DIRECTIONS)
+
+
+def bishopAttacks(square, occupied):
+    return slidingAttacks(square, occupied, BISHOP_DIRECTIONS)
+
+
+class BitboardGameState(BaseGameState):
+    def __init__(self, fen=None, move_cache=None):
+        self.pins = []
+        BaseGameState.__init__(self, fen, move_cache)
+
+
+    """
+    Take over board (the 8x8 string board is kept in sync with the bitboards so that Move objects
+    and the UI can read pieces exactly like they do with GameState) and build the bitboards from it.
+    """
+
+
+    def placePieces(self, board):
+        self.board = board
+        self.syncBitboards()
+
+
+    """
+    Rebuild the bitboards and king locations from the string board.
+    """
+
+
+    def syncBitboards(self):
+        self.bitboards = [0] * 12 # one bitboard per piece, indexed like PIECES
+        self.occupancy = [0, 0] # all white pieces, all black pieces
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece != "--":
+                    self.setPiece(piece, row * 8 + col)
+                    if piece == "wK":
+                        self.white_king_location = (row, col)
+                    elif piece == "bK":
+                        self.black_king_location = (row, col)
+
+
+    """
+    Put/remove a piece on the bitboards (the string board is updated by the caller).
+    """
+
+
+    def setPiece(self, piece, square):
+        bit = 1 << square
+        self.bitboards[PIECE_INDEX[piece]] |= bit
+        self.occupancy[WHITE if piece[0] == "w" else BLACK] |= bit
+
+
+    def clearPiece(self, piece, square):
+        bit = 1 << square
+        self.bitboards[PIECE_INDEX[piece]] ^= bit
+        self.occupancy[WHITE if piece[0] == "w" else BLACK] ^= bit
+
+
+    """
+    Move the pieces of a move on the bitboards and the board, including castling, pawn promotion and en passant.
+    """
+
+
+    def movePieces(self, code):
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        start = code & 63
+        end = (code >> 6) & 63
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        piece_captured = CODE_PIECES[(code >> 21) & 15]
+        if code & MOVE_ENPASSANT:
+            self.clearPiece(piece_captured, start_row * 8 + end_col)
+            self.board[start_row][end_col] = "--" # capturing the pawn
+        elif piece_captured != "--":
+            self.clearPiece(piece_captured, end)
+        self.clearPiece(piece_moved, start)
+        self.setPiece(piece_moved, end)
+        self.board[start_row][start_col] = "--"
+        self.board[end_row][end_col] = piece_moved
+
+        if piece_moved == "wK":
+            self.white_king_location = (end_row, end_col)
+        elif piece_moved == "bK":
+            self.black_king_location = (end_row, end_col)
+
+        # pawn promotion ~ the piece comes with the move, queen if none was chosen
+        if piece_moved[1] == "P" and (end_row == 0 or end_row == 7):
+            promoted_piece = piece_moved[0] + (PROMOTION_PIECES[(code >> 14) & 7] or "Q")
+            self.clearPiece(piece_moved, end)
+            self.setPiece(promoted_piece, end)
+            self.board[end_row][end_col] = promoted_piece
+
+        # castle move - move the rook as well
+        if code & MOVE_CASTLE:
+            if end_col - start_col == 2:  # kingside
+                rook_start, rook_end = end_col + 1, end_col - 1
+            else:   # queenside
+                rook_start, rook_end = end_col - 2, end_col + 1
+            rook = self.board[end_row][rook_start]
+            self.clearPiece(rook, end_row * 8 + rook_start)
+            self.setPiece(rook, end_row * 8 + rook_end)
+            self.board[end_row][rook_end] = rook
+            self.board[end_row][rook_start] = "--"
+
+
+    """
+    Put the pieces of a move back where they were before movePieces.
+    """
+
+
+    def takeBackPieces(self, code):
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        start = code & 63
+        end = (code >> 6) & 63
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        piece_captured = CODE_PIECES[(code >> 21) & 15]
+        self.clearPiece(self.board[end_row][end_col], end) # may be a promoted piece
+        self.setPiece(piece_moved, start)
+        self.board[start_row][start_col] = piece_moved
+        self.board[end_row][end_col] = "--"
+        if code & MOVE_ENPASSANT:
+            self.setPiece(piece_captured, start_row * 8 + end_col)
+            self.board[start_row][end_col] = piece_captured
+        elif piece_captured != "--":
+            self.setPiece(piece_captured, end)
+            self.board[end_row][end_col] = piece_captured
+
+        if piece_moved == "wK":
+            self.white_king_location = (start_row, start_col)
+        elif piece_moved == "bK":
+            self.black_king_location = (start_row, start_col)
+
+        if code & MOVE_CASTLE:
+            if end_col - start_col == 2:  # kingside
+                rook_start, rook_end = end_col + 1, end_col - 1
+            else:   # queenside
+                rook_start, rook_end = end_col - 2, end_col + 1
+            rook = self.board[end_row][rook_end]
+            self.clearPiece(rook, end_row * 8 + rook_end)
+            self.setPiece(rook, end_row * 8 + rook_start)
+            self.board[end_row][rook_start] = rook
+            self.board[end_row][rook_end] = "--"
+
+
+    """
+    Bitboard of all pieces of the given color attacking square, for the given occupancy.
+    """
+
+
+    def attackersTo(self, square, color, occupied):
+        offset = color * 6
+        bitboards = self.bitboards
+        queens = bitboards[offset + QUEEN]
+        return ((KNIGHT_ATTACKS[square] & bitboards[offset + KNIGHT])
+                | (KING_ATTACKS[square] & bitboards[offset + KING])
+                | (PAWN_ATTACKS[color ^ 1][square] & bitboards[offset + PAWN])
+                | (rookAttacks(square, occupied) & (bitboards[offset + ROOK] | queens))
+                | (bishopAttacks(square, occupied) & (bitboards[offset + BISHOP] | queens)))
+
+
+    """
+    Determine if enemy can attack the square row col.
+    """
+
+
+    def squareUnderAttack(self, row, col):
+        enemy = BLACK if self.white_to_move else WHITE
+        return self.attackersTo(row * 8 + col, enemy, self.occupancy[WHITE] | self.occupancy[BLACK]) != 0
+
+
+    def inCheck(self):
+        king_row, king_col = self.white_king_location if self.white_to_move else self.black_king_location
+        return self.squareUnderAttack(king_row, king_col)
+
+
+    """
+    Returns if the player is in check, a list of pins, and a list of checks in the same format as GameState:
+    pins are (row, col, direction row, direction col), checks are (row, col, direction row, direction col).
+    """
+
+
+    def checkForPinsAndChecks(self):
+        ally = WHITE if self.white_to_move else BLACK
+        enemy = ally ^ 1
+        king_row, king_col = self.white_king_location if ally == WHITE else self.black_king_location
+        king_square = king_row * 8 + king_col
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        checks = []
+        checkers = self.attackersTo(king_square, enemy, occupied)
+        while checkers:
+            bit = checkers & -checkers
+            checkers ^= bit
+            row, col = divmod(bit.bit_length() - 1, 8)
+            if bit & self.bitboards[enemy * 6 + KNIGHT]:
+                checks.append((row, col, row - king_row, col - king_col))
+            else:
+                checks.append((row, col, _sign(row - king_row), _sign(col - king_col)))
+        pins = []
+        for square in self.pinnedPieces(king_square, ally):
+            row, col = divmod(square, 8)
+            pins.append((row, col, _sign(row - king_row), _sign(col - king_col)))
+        return len(checks) > 0, pins, checks
+
+
+    """
+    Returns {pinned square: line mask the pinned piece may move along} for the side with the king on king_square.
+    """
+
+
+    def pinnedPieces(self, king_square, ally):
+        enemy = ally ^ 1
+        offset = enemy * 6
+        own = self.occupancy[ally]
+        enemy_occupancy = self.occupancy[enemy]
+        queens = self.bitboards[offset + QUEEN]
+        # enemy sliders that would hit the king if only enemy pieces could block them
+        snipers = ((rookAttacks(king_square, enemy_occupancy) & (self.bitboards[offset + ROOK] | queens))
+                   | (bishopAttacks(king_square, enemy_occupancy) & (self.bitboards[offset + BISHOP] | queens)))
+        pinned = {}
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            sniper = bit.bit_length() - 1
+            blockers = BETWEEN[king_square][sniper] & own
+            if blockers and blockers & (blockers - 1) == 0: # exactly one friendly piece in between
+                pinned[blockers.bit_length() - 1] = LINE[king_square][sniper]
+        return pinned
+
+
+    """
+    Generate the legal moves of the position, without looking at the cache or setting the game status flags.
+    """
+
+
+    def generateMoveCodes(self):
+        moves = []
+        ally = WHITE if self.white_to_move else BLACK
+        enemy = ally ^ 1
+        own = self.occupancy[ally]
+        enemy_occupancy = self.occupancy[enemy]
+        occupied = own | enemy_occupancy
+        king_row, king_col = self.white_king_location if ally == WHITE else self.black_king_location
+        king_square = king_row * 8 + king_col
+        board = self.board
+
+        checkers = self.attackersTo(king_square, enemy, occupied)
+        self.in_check = checkers != 0
+
+        # king moves - the king itself is removed from the occupancy so it can't hide behind itself
+        occupied_without_king = occupied ^ (1 << king_square)
+        targets = KING_ATTACKS[king_square] & ~own
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            if not self.attackersTo(end, enemy, occupied_without_king):
+                moves.append(encodeMove(king_row, king_col, end >> 3, end & 7, board))
+
+        if not checkers or checkers & (checkers - 1) == 0: # double check - only the king can move
+            if checkers:
+                checker = checkers.bit_length() - 1
+                target_mask = (BETWEEN[king_square][checker] | checkers) & ~own # capture or block
+            else:
+                target_mask = ~own & FULL
+            pinned = self.pinnedPieces(king_square, ally)
+            offset = ally * 6
+            bitboards = self.bitboards
+
+            for piece_type, attacks_function in ((KNIGHT, None), (BISHOP, bishopAttacks), (ROOK, rookAttacks), (QUEEN, None)):
+                pieces = bitboards[offset + piece_type]
+                while pieces:
+                    bit = pieces & -pieces
+                    pieces ^= bit
+                    start = bit.bit_length() - 1
+                    if piece_type == KNIGHT:
+                        if start in pinned:
+                            continue # a pinned knight can never move
+                        targets = KNIGHT_ATTACKS[start]
+                    elif piece_type == QUEEN:
+                        targets = rookAttacks(start, occupied) | bishopAttacks(start, occupied)
+                    else:
+                        targets = attacks_function(start, occupied)
+                    targets &= target_mask
+                    if start in pinned:
+                        targets &= pinned[start]
+                    base = start | (PIECE_CODES[board[start >> 3][start & 7]] << 17)
+                    while targets:
+                        target_bit = targets & -targets
+                        targets ^= target_bit
+                        end = target_bit.bit_length() - 1
+                        moves.append(base | (end << 6) | (PIECE_CODES[board[end >> 3][end & 7]] << 21))
+
+            self.getPawnMoves(ally, occupied, target_mask, pinned, checkers, king_square, moves)
+            if not checkers:
+                self.getCastleMoves(king_row, king_col, occupied, moves)
+        return moves
+
+
+    """
+    What isLegalMove needs to know about the position: (checkers, pinned, mask of squares that stop a check, king square).
+    Also sets in_check.
+    """
+
+
+    def legalityContext(self):
+        ally = WHITE if self.white_to_move else BLACK
+        king_row, king_col = self.white_king_location if ally == WHITE else self.black_king_location
+        king_square = king_row * 8 + king_col
+        checkers = self.attackersTo(king_square, ally ^ 1, self.occupancy[WHITE] | self.occupancy[BLACK])
+        self.in_check = checkers != 0
+        if not checkers:
+            target_mask = FULL
+        elif checkers & (checkers - 1) == 0:
+            target_mask = BETWEEN[king_square][checkers.bit_length() - 1] | checkers
+        else: # double check - only the king can move
+            target_mask = 0
+        return checkers, self.pinnedPieces(king_square, ally), target_mask, king_square
+
+
+    """
+    Pseudo-legal moves of one stage: captures, en passant and promotions when captures is True,
+    the other pawn pushes, piece moves to empty squares and castling otherwise.
+    """
+
+
+    def generateStageCodes(self, context, captures):
+        checkers, target_mask, king_square = context[0], context[2], context[3]
+        moves = []
+        ally = WHITE if self.white_to_move else BLACK
+        own = self.occupancy[ally]
+        enemy_occupancy = self.occupancy[ally ^ 1]
+        occupied = own | enemy_occupancy
+        stage_mask = enemy_occupancy if captures else ~occupied & FULL
+        board = self.board
+        bitboards = self.bitboards
+        offset = ally * 6
+        for piece_type in ((KING,) if target_mask == 0 else (KNIGHT, BISHOP, ROOK, QUEEN, KING)):
+            pieces = bitboards[offset + piece_type]
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                start = bit.bit_length() - 1
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[start]
+                elif piece_type == BISHOP:
+                    targets = bishopAttacks(start, occupied)
+                elif piece_type == ROOK:
+                    targets = rookAttacks(start, occupied)
+                elif piece_type == QUEEN:
+                    targets = rookAttacks(start, occupied) | bishopAttacks(start, occupied)
+                else:
+                    targets = KING_ATTACKS[start]
+                targets &= stage_mask
+                base = start | (PIECE_CODES[board[start >> 3][start & 7]] << 17)
+                while targets:
+                    target_bit = targets & -targets
+                    targets ^= target_bit
+                    end = target_bit.bit_length() - 1
+                    moves.append(base | (end << 6) | (PIECE_CODES[board[end >> 3][end & 7]] << 21))
+        if target_mask != 0:
+            self.getPawnStageMoves(ally, occupied, moves, captures)
+        if not captures and not checkers:
+            self.getCastleMoves(king_square >> 3, king_square & 7, occupied, moves)
+        return moves
+
+
+    def getPawnStageMoves(self, ally, occupied, moves, captures):
+        board = self.board
+        enemy_occupancy = self.occupancy[ally ^ 1]
+        move_amount, start_row, last_row = (-8, 6, 0) if ally == WHITE else (8, 1, 7)
+        enpassant_square = -1
+        if self.enpassant_possible != ():
+            enpassant_square = self.enpassant_possible[0] * 8 + self.enpassant_possible[1]
+        pawns = self.bitboards[ally * 6 + PAWN]
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            start = bit.bit_length() - 1
+            row, col = divmod(start, 8)
+            one_step = start + move_amount
+            promotion = one_step >> 3 == last_row
+            if captures:
+                if promotion and not (occupied >> one_step) & 1:
+                    appendPawnMove(moves, encodeMove(row, col, one_step >> 3, one_step & 7, board))
+                attacks = PAWN_ATTACKS[ally][start]
+                targets = attacks & enemy_occupancy
+                while targets:
+                    target_bit = targets & -targets
+                    targets ^= target_bit
+                    end = target_bit.bit_length() - 1
+                    appendPawnMove(moves, encodeMove(row, col, end >> 3, end & 7, board))
+                if enpassant_square >= 0 and (attacks >> enpassant_square) & 1:
+                    moves.append(encodeMove(row, col, enpassant_square >> 3, enpassant_square & 7, board, MOVE_ENPASSANT))
+            elif not promotion and not (occupied >> one_step) & 1:
+                moves.append(encodeMove(row, col, one_step >> 3, one_step & 7, board))
+                two_step = one_step + move_amount
+                if row == start_row and not (occupied >> two_step) & 1:
+                    moves.append(encodeMove(row, col, two_step >> 3, two_step & 7, board))
+
+
+    """
+    Whether a pseudo-legal move leaves the king safe, using a context from legalityContext for this position.
+    """
+
+
+    def isLegalMove(self, code, context):
+        checkers, pinned, target_mask, king_square = context
+        if code & MOVE_CASTLE:
+            return not checkers # castles are only generated after checking the squares the king crosses
+        start, end = code & 63, (code >> 6) & 63
+        enemy = BLACK if self.white_to_move else WHITE
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        if start == king_square: # the king itself is removed from the occupancy so it can't hide behind itself
+            return not self.attackersTo(end, enemy, occupied ^ (1 << king_square))
+        if code & MOVE_ENPASSANT:
+            # play the capture on the occupancy and look for any attack on the king, this covers checks and pins
+            captured_square = (start & ~7) | (end & 7)
+            after = occupied ^ (1 << start) ^ (1 << captured_square) ^ (1 << end)
+            return not self.attackersTo(king_square, enemy, after) & (self.occupancy[enemy] ^ (1 << captured_square))
+        return (target_mask & pinned.get(start, FULL)) >> end & 1 == 1
+
+
+    """
+    Whether a move found in another position (a hash or killer move) is a pseudo-legal move of this one:
+    the same piece on the start square, the same piece (or nothing) on the end square and a clear path.
+    """
+
+
+    def isPseudoLegal(self, code):
+        board = self.board
+        start, end = code & 63, (code >> 6) & 63
+        piece = CODE_PIECES[(code >> 17) & 15]
+        if board[start >> 3][start & 7] != piece or piece[0] != ("w" if self.white_to_move else "b"):
+            return False
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        if code & MOVE_CASTLE:
+            castles = []
+            self.getCastleMoves(start >> 3, start & 7, occupied, castles)
+            return code in castles
+        if code & MOVE_ENPASSANT:
+            return divmod(end, 8) == self.enpassant_possible
+        if board[end >> 3][end & 7] != CODE_PIECES[(code >> 21) & 15]:
+            return False
+        # squares in between have to be empty, for pawns this only matters on a 2 square push
+        return piece[1] in "NK" or not BETWEEN[start][end] & occupied
+
+
+    """
+    Whether neither side has enough material left to checkmate. Piece counts come from the bitboards,
+    and only when at most 4 pieces are left since no more can be a material draw.
+    """
+
+
+    def materialDraw(self):
+        return bin(self.occupancy[WHITE] | self.occupancy[BLACK]).count("1") <= 4 and \
+            insufficientMaterial([0] + [bin(bitboard).count("1") for bitboard in self.bitboards], self.board)
+
+
+    def getPawnMoves(self, ally, occupied, target_mask, pinned, checkers, king_square, moves):
+        board = self.board
+        enemy = ally ^ 1
+        enemy_occupancy = self.occupancy[enemy]
+        if ally == WHITE:
+            move_amount = -8
+            start_row = 6
+        else:
+            move_amount = 8
+            start_row = 1
+        pawns = self.bitboards[ally * 6 + PAWN]
+        enpassant_square = -1
+        if self.enpassant_possible != ():
+            enpassant_square = self.enpassant_possible[0] * 8 + self.enpassant_possible[1]
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            start = bit.bit_length() - 1
+            start_square = divmod(start, 8)
+            allowed = target_mask & pinned.get(start, FULL)
+            one_step = start + move_amount
+            if not (occupied >> one_step) & 1:
+                if (allowed >> one_step) & 1:
+                    appendPawnMove(moves, encodeMove(start_square[0], start_square[1], one_step >> 3, one_step & 7, board))
+                two_step = one_step + move_amount
+                if start_square[0] == start_row and not (occupied >> two_step) & 1 and (allowed >> two_step) & 1:
+                    moves.append(encodeMove(start_square[0], start_square[1], two_step >> 3, two_step & 7, board))
+            attacks = PAWN_ATTACKS[ally][start]
+            captures = attacks & enemy_occupancy & allowed
+            while captures:
+                target_bit = captures & -captures
+                captures ^= target_bit
+                end = target_bit.bit_length() - 1
+                appendPawnMove(moves, encodeMove(start_square[0], start_square[1], end >> 3, end & 7, board))
+            if enpassant_square >= 0 and (attacks >> enpassant_square) & 1:
+                # play the capture on the occupancy and look for any attack on the king,
+                # this covers pins along the rank through both pawns as well
+                captured_square = start_square[0] * 8 + enpassant_square % 8
+                after = occupied ^ bit ^ (1 << captured_square) ^ (1 << enpassant_square)
+                if not self.attackersTo(king_square, enemy, after) & (enemy_occupancy ^ (1 << captured_square)):
+                    moves.append(encodeMove(start_square[0], start_square[1], enpassant_square >> 3, enpassant_square & 7, board, MOVE_ENPASSANT))
+
+
+    """
+    Generate castle moves for the king at (row, col), the caller makes sure the king is not in check.
+    """
+
+
+    def getCastleMoves(self, row, col, occupied, moves):
+        rights = self.current_castling_rights
+        enemy = BLACK if self.white_to_move else WHITE
+        square = row * 8 + col
+        if (rights.wks if self.white_to_move else rights.bks):
+            if not (occupied >> (square + 1)) & 1 and not (occupied >> (square + 2)) & 1:
+                if not self.attackersTo(square + 1, enemy, occupied) and not self.attackersTo(square + 2, enemy, occupied):
+                    moves.append(encodeMove(row, col, row, col + 2, self.board, MOVE_CASTLE))
+        if (rights.wqs if self.white_to_move else rights.bqs):
+            if not (occupied >> (square - 1)) & 1 and not (occupied >> (square - 2)) & 1 and not (occupied >> (square - 3)) & 1:
+                if not self.attackersTo(square - 1, enemy, occupied) and not self.attackersTo(square - 2, enemy, occupied):
+                    moves.append(encodeMove(row, col, row, col - 2, self.board, MOVE_CASTLE))
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
@@ -5,14 +5,490 @@ It will also be responsible for determining the valid moves
 at the current state. It will also keep a move log.
 """
 
+import random
+from collections import OrderedDict, namedtuple
 
-class GameState():
-    def __init__(self):
+from ChessEvaluation import PIECE_VALUES, PIECE_SQUARE_SCORES, scoreBoard
+
+
+# directions in the order used by checkForPinsAndChecks: first 4 orthogonal, last 4 diagonal
+DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+
+
+"""
+Precomputed attack tables indexed [row][col], built once on import so attack queries never have to check board bounds.
+"""
+
+
+def _buildLeaperTable(offsets):
+    table = []
+    for row in range(8):
+        table.append([])
+        for col in range(8):
+            table[row].append(tuple((row + d_row, col + d_col) for d_row, d_col in offsets
+                                    if 0 <= row + d_row <= 7 and 0 <= col + d_col <= 7))
+    return table
+
+
+def _buildRayTable():
+    table = []
+    for row in range(8):
+        table.append([])
+        for col in range(8):
+            rays = []
+            for d_row, d_col in DIRECTIONS:
+                rays.append(tuple((row + d_row * i, col + d_col * i) for i in range(1, 8)
+                                  if 0 <= row + d_row * i <= 7 and 0 <= col + d_col * i <= 7))
+            table[row].append(tuple(rays))
+    return table
+
+
+KNIGHT_TABLE = _buildLeaperTable(KNIGHT_OFFSETS)
+KING_TABLE = _buildLeaperTable(DIRECTIONS)
+RAY_TABLE = _buildRayTable()  # RAY_TABLE[row][col][direction index] -> squares going outward from (row, col)
+
+
+"""
+Moves are packed into a single int inside the engine, Move objects are only built for the UI and notation:
+bits 0-5 start square and bits 6-11 end square (square = row * 8 + col), bit 12 en passant, bit 13 castle,
+bits 14-16 promotion piece (index into PROMOTION_PIECES, 0 = no promotion), bits 17-20 piece moved,
+bits 21-24 piece captured (0 = nothing captured).
+"""
+
+
+CODE_PIECES = ["--", "wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK"]
+PIECE_CODES = {piece: code for code, piece in enumerate(CODE_PIECES)}   # "--" -> 0, "wP" -> 1 ... "bK" -> 12
+MOVE_ENPASSANT = 1 << 12
+MOVE_CASTLE = 1 << 13
+PROMOTION_PIECES = ["", "Q", "R", "B", "N"]
+PROMOTION_CODES = [index << 14 for index in range(1, len(PROMOTION_PIECES))] # promotion bits for Q, R, B, N
+
+
+def encodeMove(start_row, start_col, end_row, end_col, board, flags=0):
+    piece_moved = board[start_row][start_col]
+    piece_captured = board[end_row][end_col]
+    if flags & MOVE_ENPASSANT:
+        piece_captured = "bP" if piece_moved == "wP" else "wP"
+    return ((start_row * 8 + start_col) | ((end_row * 8 + end_col) << 6) | flags
+            | (PIECE_CODES[piece_moved] << 17) | (PIECE_CODES[piece_captured] << 21))
+
+
+"""
+Add a pawn move to the list, a move onto the last row is added once for every promotion piece.
+"""
+
+
+def appendPawnMove(moves, code):
+    end_row = (code >> 9) & 7
+    if end_row == 0 or end_row == 7:
+        for promotion in PROMOTION_CODES:
+            moves.append(code | promotion)
+    else:
+        moves.append(code)
+
+
+"""
+Zobrist hashing: every (piece, square), the side to move, each castling right and each en passant file
+gets a fixed random 64-bit number, and the key of a position is the XOR of the numbers of everything in it.
+Like a Polyglot key, the en passant file only counts when a pawn of the side to move stands next to the pawn that
+just moved two squares, so a position reached again after a double push that couldn't be taken gets the same key.
+A fixed seed keeps the keys identical between runs and processes.
+"""
+
+
+_zobrist_random = random.Random(20210310)
+ZOBRIST_PIECES = {piece: [[_zobrist_random.getrandbits(64) for col in range(8)] for row in range(8)]
+                  for piece in ("wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK")}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for i in range(4)] # wks, bks, wqs, bqs
+ZOBRIST_ENPASSANT = [_zobrist_random.getrandbits(64) for col in range(8)]
+
+
+def zobristCastlingKey(castle_rights):
+    key = 0
+    if castle_rights.wks:
+        key ^= ZOBRIST_CASTLING[0]
+    if castle_rights.bks:
+        key ^= ZOBRIST_CASTLING[1]
+    if castle_rights.wqs:
+        key ^= ZOBRIST_CASTLING[2]
+    if castle_rights.bqs:
+        key ^= ZOBRIST_CASTLING[3]
+    return key
+
+
+def zobristEnpassantKey(enpassant_possible, board, white_to_move):
+    if enpassant_possible == ():
+        return 0
+    row, col = enpassant_possible
+    pawn, pawn_row = ("wP", row + 1) if white_to_move else ("bP", row - 1)
+    if (col > 0 and board[pawn_row][col - 1] == pawn) or (col < 7 and board[pawn_row][col + 1] == pawn):
+        return ZOBRIST_ENPASSANT[col]
+    return 0
+
+
+"""
+Compute the zobrist key of a position from scratch.
+"""
+
+
+def zobristKey(board, white_to_move, castle_rights, enpassant_possible):
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            if board[row][col] != "--":
+                key ^= ZOBRIST_PIECES[board[row][col]][row][col]
+    if not white_to_move:
+        key ^= ZOBRIST_BLACK_TO_MOVE
+    return key ^ zobristCastlingKey(castle_rights) ^ zobristEnpassantKey(enpassant_possible, board, white_to_move)
+
+
+"""
+Incrementally update a zobrist key for a move that has just been made on board.
+Only the squares and flags the move touched are XORed in or out. The en passant keys (see zobristEnpassantKey)
+before and after the move come from the caller, the one before has to be taken on the board before the move.
+"""
+
+
+def zobristUpdate(key, code, board, previous_enpassant_key, enpassant_key, previous_castle_rights, castle_rights):
+    start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+    piece_captured = CODE_PIECES[(code >> 21) & 15]
+    key ^= ZOBRIST_BLACK_TO_MOVE
+    key ^= ZOBRIST_PIECES[CODE_PIECES[(code >> 17) & 15]][start_row][start_col]
+    key ^= ZOBRIST_PIECES[board[end_row][end_col]][end_row][end_col] # the promoted piece on promotion
+    if code & MOVE_ENPASSANT:
+        key ^= ZOBRIST_PIECES[piece_captured][start_row][end_col]
+    elif piece_captured != "--":
+        key ^= ZOBRIST_PIECES[piece_captured][end_row][end_col]
+    if code & MOVE_CASTLE:
+        if end_col - start_col == 2:  # kingside
+            rook_start, rook_end = end_col + 1, end_col - 1
+        else:   # queenside
+            rook_start, rook_end = end_col - 2, end_col + 1
+        rook_keys = ZOBRIST_PIECES[board[end_row][rook_end]][end_row]
+        key ^= rook_keys[rook_start] ^ rook_keys[rook_end]
+    key ^= previous_enpassant_key ^ enpassant_key
+    if previous_castle_rights is not castle_rights:
+        key ^= zobristCastlingKey(previous_castle_rights) ^ zobristCastlingKey(castle_rights)
+    return key
+
+
+"""
+Change of the material and piece-square score (see ChessEvaluation) caused by a move,
+board is the position right after the move (so the promoted piece is on the end square).
+makeMove adds it and undoMove subtracts it before taking the move back.
+"""
+
+
+def scoreDelta(code, board):
+    start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+    piece_captured = CODE_PIECES[(code >> 21) & 15]
+    delta = PIECE_SQUARE_SCORES[board[end_row][end_col]][end_row * 8 + end_col] \
+            - PIECE_SQUARE_SCORES[CODE_PIECES[(code >> 17) & 15]][start_row * 8 + start_col]
+    if code & MOVE_ENPASSANT:
+        delta -= PIECE_SQUARE_SCORES[piece_captured][start_row * 8 + end_col]
+    elif piece_captured != "--":
+        delta -= PIECE_SQUARE_SCORES[piece_captured][end_row * 8 + end_col]
+    if code & MOVE_CASTLE:
+        if end_col - start_col == 2:  # kingside
+            rook_start, rook_end = end_col + 1, end_col - 1
+        else:   # queenside
+            rook_start, rook_end = end_col - 2, end_col + 1
+        rook_scores = PIECE_SQUARE_SCORES[board[end_row][rook_end]]
+        delta += rook_scores[end_row * 8 + rook_end] - rook_scores[end_row * 8 + rook_start]
+    return delta
+
+
+"""
+Parse a FEN string into (board, white_to_move, castle rights, enpassant_possible, halfmove_clock, fullmove_number)
+in the formats used by GameState. Missing trailing fields get their start position defaults.
+Raises ValueError("invalid fen: ...") for anything the engine can't play from: a board that isn't 8 ranks of 8 files,
+unknown pieces, not exactly one king per side, pawns on the first or last rank, or a bad side to move, castling field,
+en passant square or clock. A castling right whose king or rook isn't on its home square is dropped.
+"""
+
+
+def parseFen(fen):
+    fields = fen.split()
+    if not 1 <= len(fields) <= 6:
+        raise ValueError("invalid fen: expected 1 to 6 fields, got %d" % len(fields))
+    ranks = fields[0].split("/")
+    if len(ranks) != 8:
+        raise ValueError("invalid fen: expected 8 ranks, got %d" % len(ranks))
+    board = []
+    for rank in ranks:
+        row = []
+        for char in rank:
+            if char in "12345678":
+                row += ["--"] * int(char)
+            elif char in "PNBRQKpnbrqk":
+                row.append(("w" if char.isupper() else "b") + char.upper())
+            else:
+                raise ValueError("invalid fen: unknown piece %r" % char)
+        if len(row) != 8:
+            raise ValueError("invalid fen: rank %s doesn't have 8 files" % rank)
+        board.append(row)
+    counts = countPieces(board)
+    if counts[PIECE_CODES["wK"]] != 1 or counts[PIECE_CODES["bK"]] != 1:
+        raise ValueError("invalid fen: each side needs exactly one king")
+    if any(piece[1] == "P" for piece in board[0] + board[7]):
+        raise ValueError("invalid fen: pawn on the first or last rank")
+
+    if len(fields) > 1 and fields[1] not in ("w", "b"):
+        raise ValueError("invalid fen: side to move must be w or b")
+    white_to_move = len(fields) < 2 or fields[1] == "w"
+
+    castling = fields[2] if len(fields) > 2 else "-"
+    if castling != "-" and (not set(castling) <= set("KQkq") or len(set(castling)) != len(castling)):
+        raise ValueError("invalid fen: bad castling field %s" % castling)
+    # a right only counts while its king and rook are still on their home squares
+    castle_rights = CastleRights("K" in castling and board[7][4] == "wK" and board[7][7] == "wR",
+                                 "k" in castling and board[0][4] == "bK" and board[0][7] == "bR",
+                                 "Q" in castling and board[7][4] == "wK" and board[7][0] == "wR",
+                                 "q" in castling and board[0][4] == "bK" and board[0][0] == "bR")
+
+    enpassant_possible = ()
+    if len(fields) > 3 and fields[3] != "-":
+        square = fields[3]
+        if len(square) != 2 or square[0] not in Move.files_to_cols or square[1] != ("6" if white_to_move else "3"):
+            raise ValueError("invalid fen: bad en passant square %s" % square)
+        enpassant_possible = (Move.ranks_to_rows[square[1]], Move.files_to_cols[square[0]])
+
+    if any(not clock.isdigit() for clock in fields[4:]):
+        raise ValueError("invalid fen: clocks must be non-negative numbers")
+    halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    fullmove_number = max(int(fields[5]), 1) if len(fields) > 5 else 1
+    return board, white_to_move, castle_rights, enpassant_possible, halfmove_clock, fullmove_number
+
+
+"""
+Write a position as a FEN string, the inverse of parseFen.
+"""
+
+
+def toFen(board, white_to_move, castle_rights, enpassant_possible, halfmove_clock=0, fullmove_number=1):
+    ranks = []
+    for row in board:
+        rank = ""
+        empty = 0
+        for piece in row:
+            if piece == "--":
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece[1] if piece[0] == "w" else piece[1].lower()
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    castling = ("K" if castle_rights.wks else "") + ("Q" if castle_rights.wqs else "") + \
+               ("k" if castle_rights.bks else "") + ("q" if castle_rights.bqs else "")
+    enpassant = "-"
+    if enpassant_possible != ():
+        enpassant = Move.cols_to_files[enpassant_possible[1]] + Move.rows_to_ranks[enpassant_possible[0]]
+    return "%s %s %s %s %d %d" % ("/".join(ranks), "w" if white_to_move else "b", castling or "-", enpassant,
+                                  halfmove_clock, fullmove_number)
+
+
+"""
+moveID (start, end and promotion bits of a packed move) of a move in UCI notation ("e2e4", "e7e8q"),
+or None if the text isn't a UCI move. Compare it with code & MOVE_ID_MASK or look it up in MoveList.by_id.
+"""
+
+
+MOVE_ID_MASK = 0x1CFFF
+
+
+def uciMoveId(text):
+    if len(text) not in (4, 5) or text[0] not in "abcdefgh" or text[2] not in "abcdefgh" \
+            or text[1] not in "12345678" or text[3] not in "12345678" or (len(text) == 5 and text[4] not in "qrbn"):
+        return None
+    start = (8 - int(text[1])) * 8 + "abcdefgh".index(text[0])
+    end = (8 - int(text[3])) * 8 + "abcdefgh".index(text[2])
+    promotion = PROMOTION_PIECES.index(text[4].upper()) if len(text) == 5 else 0
+    return start | (end << 6) | (promotion << 14)
+
+
+"""
+Draw rules.
+countPieces gives the number of each piece on a board as a list indexed by piece code (see CODE_PIECES),
+insufficientMaterial decides from those counts whether neither side can possibly checkmate:
+king against king, king and one minor piece against king, or kings and one bishop each on the same square color.
+"""
+
+
+FIFTY_MOVE_PLIES = 100
+DRAW_REPETITION = "threefold repetition"
+DRAW_FIFTY_MOVES = "fifty-move rule"
+DRAW_MATERIAL = "insufficient material"
+
+
+def countPieces(board):
+    counts = [0] * len(CODE_PIECES)
+    for row in board:
+        for piece in row:
+            if piece != "--":
+                counts[PIECE_CODES[piece]] += 1
+    return counts
+
+
+def insufficientMaterial(counts, board):
+    # any pawn, rook or queen can still mate
+    if counts[1] or counts[4] or counts[5] or counts[7] or counts[10] or counts[11]:
+        return False
+    minors = counts[2] + counts[3] + counts[8] + counts[9]
+    if minors <= 1:
+        return True
+    if minors == 2 and counts[3] == 1 and counts[9] == 1: # a bishop each, only a draw if they share a square color
+        colors = [(row + col) % 2 for row in range(8) for col in range(8) if board[row][col][1] == "B"]
+        return colors[0] == colors[1]
+    return False
+
+
+CODE_VALUES = [PIECE_VALUES[piece[1]] if piece != "--" else 0 for piece in CODE_PIECES] # indexed by the piece codes of a packed move
+PROMOTION_GAINS = [0] + [PIECE_VALUES[piece] - PIECE_VALUES["P"] for piece in PROMOTION_PIECES[1:]]
+
+
+"""
+Ordering score of a capture or promotion: most valuable victim first, least valuable attacker among equal victims,
+a promotion counts as capturing what the pawn gains.
+"""
+
+
+def mvvLvaScore(code):
+    return (CODE_VALUES[(code >> 21) & 15] + PROMOTION_GAINS[(code >> 14) & 7]) * 16 - CODE_VALUES[(code >> 17) & 15] // 16
+
+
+"""
+Lazy, staged legal move generation for search, shared by both backends: yields the hash move, then captures and
+promotions by MVV-LVA, then the killers, then the remaining quiet moves (by history score when a history table
+indexed by piece moved * 64 + end square is given).
+A stage is only generated once the previous one is used up, so a cutoff on an early move skips the rest of the
+generation, and each pseudo-legal move is checked for legality just before it is yielded.
+Hash and killer moves come from other nodes and are validated against the position first.
+quiets=False stops after the captures (for quiescence search).
+The caller may make and take back moves between iterations. Game status flags are not set, but in_check is set for
+the position before the first move is yielded, so a caller that got no moves can tell mate from stalemate.
+"""
+
+
+def stagedMoveCodes(game_state, hash_move=None, killers=(), history=None, quiets=True):
+    context = game_state.legalityContext()
+    if hash_move is not None and game_state.isPseudoLegal(hash_move) and game_state.isLegalMove(hash_move, context):
+        yield hash_move
+    else:
+        hash_move = None
+
+    captures = game_state.generateStageCodes(context, True)
+    captures.sort(key=mvvLvaScore, reverse=True)
+    for code in captures:
+        if code != hash_move and game_state.isLegalMove(code, context):
+            yield code
+    if not quiets:
+        return
+
+    killers = tuple(killer for i, killer in enumerate(killers)
+                    if killer is not None and killer != hash_move and killer not in killers[:i])
+    for killer in killers:
+        if not (killer >> 21) & 15 and not (killer >> 14) & 7 and game_state.isPseudoLegal(killer) \
+                and game_state.isLegalMove(killer, context):
+            yield killer
+
+    quiets = game_state.generateStageCodes(context, False)
+    if history is not None:
+        quiets.sort(key=lambda code: history[((code >> 17) & 15) * 64 + ((code >> 6) & 63)], reverse=True)
+    for code in quiets:
+        if code != hash_move and code not in killers and game_state.isLegalMove(code, context):
+            yield code
+
+
+NULL_MOVE = 0 # logged in move_log for a null move, see BaseGameState.makeNullMove
+
+
+"""
+Immutable copy of a position: board as a tuple of 8 row tuples, side to move, castling rights as (wks, bks, wqs, bqs),
+en passant square, the two clocks and the zobrist key.
+Taking one copies 64 strings and restoring one rebuilds the rows, no moves are replayed.
+Snapshots are hashable and small enough to pickle cheaply between processes, for a cache key that ignores the clocks
+use zobrist_key.
+"""
+
+
+Snapshot = namedtuple("Snapshot", ["board", "white_to_move", "castling", "enpassant", "halfmove_clock", "fullmove_number",
+                                   "zobrist_key"])
+
+
+"""
+Bounded LRU cache of legal moves: zobrist key -> (tuple of move codes, in_check).
+Legal moves only depend on what the zobrist key covers (pieces, side to move, castling rights, en passant square),
+so entries never go stale when moves are made or taken back and no invalidation is needed there.
+Draws depend on the game history and are worked out again on every hit. One cache can be shared by several GameStates
+(of either backend, both produce the same move codes), call clear() after editing a board by hand.
+"""
+
+
+class MoveCache():
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+
+    def put(self, key, codes, in_check):
+        self.entries[key] = (tuple(codes), in_check)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "capacity": self.capacity, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+"""
+What both backends (GameState and ChessBitboard.BitboardGameState) share: FEN input and output, snapshots,
+the logs makeMove and undoMove keep (en passant square, castling rights, clocks, zobrist keys and repetition counts),
+null moves, the move cache and the game status flags.
+A backend keeps the pieces in its own structures and fills in placePieces, movePieces, takeBackPieces,
+generateMoveCodes and materialDraw, the string board is always kept up to date for the UI and Move objects.
+"""
+
+
+class BaseGameState():
+    def __init__(self, fen=None, move_cache=None):
+        self.in_check = False
+        self.checks = []
+        self.move_cache = move_cache # optional MoveCache shared by getValidMoveCodes calls
         # board is an 8x8 2D list, each element of the list has 2 characters,
         # the first char represents the color of the piece, "b" or "w"
         # the second char represents the type of the piece, "K", "Q", "R", "B", "N", "P"
         # "--" represents an empty space with no piece --> easier to parse
-        self.board = [
+        board = [
             ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],   # view of white piece
             ["bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"],
             ["--", "--", "--", "--", "--", "--", "--", "--"],
@@ -22,149 +498,375 @@ class GameState():
             ["wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"],
             ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
         ]
-        self.move_functions = {"P": self.getPawnMoves, "R": self.getRookMoves, "N": self.getKnightMoves,
-                              "B": self.getBishopMoves, "Q": self.getQueenMoves, "K": self.getKingMoves}
-        self.white_to_move = True
+        self.setPosition(board, True, CastleRights(True, True, True, True), ())
+        if fen is not None:
+            self.loadFen(fen)
+
+
+    """
+    Set up the position described by a FEN string, clearing the move log.
+    """
+
+
+    def loadFen(self, fen):
+        board, white_to_move, castle_rights, enpassant_possible, halfmove_clock, fullmove_number = parseFen(fen)
+        self.setPosition(board, white_to_move, castle_rights, enpassant_possible, halfmove_clock, fullmove_number)
+
+
+    """
+    The current position as a FEN string.
+    """
+
+
+    def getFen(self):
+        return toFen(self.board, self.white_to_move, self.current_castling_rights, self.enpassant_possible,
+                     self.halfmove_clock, self.fullmove_number)
+
+
+    """
+    Immutable Snapshot of the current position, see restore. Snapshots of both backends are interchangeable.
+    """
+
+
+    def snapshot(self):
+        rights = self.current_castling_rights
+        return Snapshot(tuple(tuple(row) for row in self.board), self.white_to_move, (rights.wks, rights.bks, rights.wqs, rights.bqs),
+                        self.enpassant_possible, self.halfmove_clock, self.fullmove_number, self.zobrist_key)
+
+
+    """
+    Go back to a position taken with snapshot (from this or any other game state), clearing the move log like loadFen.
+    """
+
+
+    def restore(self, snapshot):
+        self.setPosition([list(row) for row in snapshot.board], snapshot.white_to_move, CastleRights(*snapshot.castling),
+                         snapshot.enpassant, snapshot.halfmove_clock, snapshot.fullmove_number, snapshot.zobrist_key)
+
+
+    def setPosition(self, board, white_to_move, castle_rights, enpassant_possible, halfmove_clock=0, fullmove_number=1, zobrist_key=None):
+        self.placePieces(board)
+        self.white_to_move = white_to_move
+        self.current_castling_rights = castle_rights
+        self.enpassant_possible = enpassant_possible # coordinates for the square where en passsant capture is possible
+        self.halfmove_clock = halfmove_clock # plies since the last capture or pawn move
+        self.halfmove_clock_log = [halfmove_clock]
+        self.fullmove_number = fullmove_number
         self.move_log = []
-        self.white_king_location = (7,4)
-        self.black_king_location = (0,4)
         self.checkmate = False
         self.stalemate = False
-        self.in_check = False
-        self.pins = []
-        self.checks = []
-        self.enpassant_possible = () # coordinates for the square where en passsant capture is possible
-        self.current_castling_rights = CastleRights(True, True, True, True)
-        self.castle_rights_log = [CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
-                                              self.current_castling_rights.wqs, self.current_castling_rights.bqs)]
-        
+        self.enpassant_possible_log = [self.enpassant_possible]
+        self.castle_rights_log = [self.current_castling_rights]
+        # 64-bit zobrist key of the current position, updated incrementally by makeMove/undoMove
+        if zobrist_key is None:
+            zobrist_key = zobristKey(self.board, self.white_to_move, self.current_castling_rights, self.enpassant_possible)
+        self.zobrist_key = zobrist_key
+        self.zobrist_log = [self.zobrist_key]
+        # draw detection state, kept up to date by makeMove/undoMove so checking for a draw never rescans move_log
+        self.repetition_counts = {self.zobrist_key: 1} # zobrist key -> times the position occurred in this game
+        self.draw = False
+        self.draw_reason = None
+        self.score = scoreBoard(self.board) # material and piece-square score from white's view, see ChessEvaluation
+
 
     """
-    Takes a Move as a parameter and executes it (will not work for castling, pawn promotion, and en-passant).
+    Takes a move (a packed move int or a Move) as a parameter and executes it.
+    The backend moves the pieces, the logs and keys are updated here.
     """
 
 
     def makeMove(self, move):
-        self.board[move.start_row][move.start_col] = "--"
-        self.board[move.end_row][move.end_col] = move.piece_moved
-        self.move_log.append(move) # log the move so we can undo it later
+        code = move if type(move) is int else move.move_code
+        previous_enpassant_key = zobristEnpassantKey(self.enpassant_possible, self.board, self.white_to_move)
+        self.movePieces(code)
+        self.move_log.append(code) # log the move so we can undo it later
         self.white_to_move = not self.white_to_move #switch players
-        # update king's location if moved
-        if move.piece_moved == "wK":
-            self.white_king_location = (move.end_row, move.end_col)
-        elif move.piece_moved == "bK":
-            self.black_king_location = (move.end_row, move.end_col)
-            
-        # pawn promotion
-        if move.is_pawn_promotion:
-            promoted_piece = input("Promote to Q, R, B, or N: ") # take this to UI later
-            self.board[move.end_row][move.end_col] = move.piece_moved[0] + promoted_piece
-            
-        # en passant move
-        if move.is_enpassant_move:
-            self.board[move.start_row][move.end_col] = "--" # capturing the pawn
-            
+        if self.white_to_move: # black just moved
+            self.fullmove_number += 1
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        # the halfmove clock restarts on every pawn move or capture
+        self.halfmove_clock = 0 if piece_moved[1] == "P" or (code >> 21) & 15 else self.halfmove_clock + 1
+        self.halfmove_clock_log.append(self.halfmove_clock)
+
         # update enpassant_possible variable
-        if move.piece_moved[1] == "P" and abs(move.start_row - move.end_row) == 2: # only on 2 square pawn advance
-            self.enpassant_possible = ((move.start_row + move.end_row) // 2, move.start_col)  
+        start_row, end_row = (code >> 3) & 7, (code >> 9) & 7
+        if piece_moved[1] == "P" and abs(start_row - end_row) == 2: # only on 2 square pawn advance
+            self.enpassant_possible = ((start_row + end_row) // 2, code & 7)
         else:
             self.enpassant_possible = ()
-        
-        # castle move
-        if move.is_castle_move:
-            if move.end_col - move.start_col == 2:  # kingside castle move
-                self.board[move.end_row][move.end_col-1] = self.board[move.end_row][move.end_col+1] # moves the rook
-                self.board[move.end_row][move.end_col+1] = "--" # erase old rook 
-            else:   # queenside castle move
-                self.board[move.end_row][move.end_col+1] = self.board[move.end_row][move.end_col-2] # moves the rook
-                self.board[move.end_row][move.end_col-2] = "--" # erase old rook
-
+        self.enpassant_possible_log.append(self.enpassant_possible)
 
         # update castling rights ~ whenever it is a rook or a king move
-        self.updateCastleRights(move)
-        self.castle_rights_log.append(CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
-                                              self.current_castling_rights.wqs, self.current_castling_rights.bqs))
-        
+        self.updateCastleRights(code)
+        self.castle_rights_log.append(self.current_castling_rights)
+
+        # update the zobrist key
+        self.zobrist_key = zobristUpdate(self.zobrist_key, code, self.board, previous_enpassant_key,
+                                         zobristEnpassantKey(self.enpassant_possible, self.board, self.white_to_move),
+                                         self.castle_rights_log[-2], self.current_castling_rights)
+        self.zobrist_log.append(self.zobrist_key)
+        self.repetition_counts[self.zobrist_key] = self.repetition_counts.get(self.zobrist_key, 0) + 1
+        self.score += scoreDelta(code, self.board)
+
+
+    """
+    A null move passes the turn without moving, for null move pruning in search. It is logged as NULL_MOVE in move_log
+    so undoMove takes it back like any other move. The en passant square is cleared, the castling rights stay and
+    the position is not counted for repetitions.
+    """
+
+
+    def makeNullMove(self):
+        self.move_log.append(NULL_MOVE)
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE ^ zobristEnpassantKey(self.enpassant_possible, self.board, self.white_to_move)
+        self.zobrist_log.append(self.zobrist_key)
+        self.white_to_move = not self.white_to_move
+        if self.white_to_move:
+            self.fullmove_number += 1
+        self.halfmove_clock += 1
+        self.halfmove_clock_log.append(self.halfmove_clock)
+        self.enpassant_possible = ()
+        self.enpassant_possible_log.append(self.enpassant_possible)
+        self.castle_rights_log.append(self.current_castling_rights)
+
 
     """
     Undo the last move made.
     """
 
 
-    def undoMove(self):   
+    def undoMove(self):
         if len(self.move_log) != 0: # make sure that there is a move to undo
-            move = self.move_log.pop()
-            self.board[move.start_row][move.start_col] = move.piece_moved
-            self.board[move.end_row][move.end_col] = move.piece_captured
+            code = self.move_log.pop()
+            if code != NULL_MOVE: # a null move didn't change the board or the repetition counts
+                self.score -= scoreDelta(code, self.board)
+                self.takeBackPieces(code)
+                count = self.repetition_counts[self.zobrist_key]
+                if count == 1:
+                    del self.repetition_counts[self.zobrist_key]
+                else:
+                    self.repetition_counts[self.zobrist_key] = count - 1
             self.white_to_move = not self.white_to_move # swap players
+            if not self.white_to_move: # undoing a black move
+                self.fullmove_number -= 1
+            self.halfmove_clock_log.pop()
+            self.halfmove_clock = self.halfmove_clock_log[-1]
+            # restore the en passant square and castle rights from before the move
+            self.enpassant_possible_log.pop()
+            self.enpassant_possible = self.enpassant_possible_log[-1]
+            self.castle_rights_log.pop()
+            self.current_castling_rights = self.castle_rights_log[-1]
+            self.zobrist_log.pop()
+            self.zobrist_key = self.zobrist_log[-1]
+            self.checkmate = False
+            self.stalemate = False
+            self.draw = False
+            self.draw_reason = None
+
+
+    """
+    Update the castle rights given the move, a new CastleRights object is created so the log entries never change.
+    Moving a king or rook and capturing a rook on its starting square both lose the right.
+    """
+
+
+    def updateCastleRights(self, code):
+        rights = self.current_castling_rights
+        wks, bks, wqs, bqs = rights.wks, rights.bks, rights.wqs, rights.bqs
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        if piece_moved == "wK":
+            wks = wqs = False
+        elif piece_moved == "bK":
+            bks = bqs = False
+        for row, col in (((code >> 3) & 7, code & 7), ((code >> 9) & 7, (code >> 6) & 7)):
+            if (row, col) == (7, 0):
+                wqs = False
+            elif (row, col) == (7, 7):
+                wks = False
+            elif (row, col) == (0, 0):
+                bqs = False
+            elif (row, col) == (0, 7):
+                bks = False
+        self.current_castling_rights = CastleRights(wks, bks, wqs, bqs)
+
+
+    """
+    All moves considering checks, as a MoveList of Move objects.
+    """
+
+
+    def getValidMoves(self):
+        return MoveList(self.getValidMoveCodes())
+
+
+    """
+    All moves considering checks, as packed move ints. Also sets in_check, checkmate, stalemate, draw and draw_reason.
+    With a move_cache, a position seen before only costs a lookup and a copy of the cached list.
+    """
+
+
+    def getValidMoveCodes(self):
+        if self.move_cache is None:
+            moves = self.generateMoveCodes()
+        else:
+            entry = self.move_cache.get(self.zobrist_key)
+            if entry is None:
+                moves = self.generateMoveCodes()
+                self.move_cache.put(self.zobrist_key, moves, self.in_check)
+            else:
+                moves = list(entry[0]) # callers are free to sort or change the list they get
+                self.in_check = entry[1]
+        if len(moves) == 0:
+            if self.in_check:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+            self.draw_reason = None
+        else:
+            self.checkmate = False
+            self.stalemate = False
+            self.draw_reason = self.getDrawReason()
+        self.draw = self.draw_reason is not None
+        return moves
+
+
+    """
+    Legal moves one at a time, most promising first, see stagedMoveCodes.
+    """
+
+
+    def getStagedMoveCodes(self, hash_move=None, killers=(), history=None, quiets=True):
+        return stagedMoveCodes(self, hash_move, killers, history, quiets)
+
+
+    """
+    Returns why the current position is a draw (DRAW_REPETITION, DRAW_FIFTY_MOVES or DRAW_MATERIAL),
+    or None if it isn't. Stalemate is reported separately by getValidMoves.
+    Constant time: the clock and repetition counts are maintained by makeMove/undoMove.
+    """
+
+
+    def getDrawReason(self):
+        if self.halfmove_clock >= FIFTY_MOVE_PLIES:
+            return DRAW_FIFTY_MOVES
+        if self.repetition_counts[self.zobrist_key] >= 3:
+            return DRAW_REPETITION
+        if self.materialDraw():
+            return DRAW_MATERIAL
+        return None
+
+
+class GameState(BaseGameState):
+    def __init__(self, fen=None, move_cache=None):
+        self.move_functions = {"P": self.getPawnMoves, "R": self.getRookMoves, "N": self.getKnightMoves,
+                              "B": self.getBishopMoves, "Q": self.getQueenMoves, "K": self.getKingMoves}
+        self.pins = {} # (row, col) of each pinned piece -> direction from the king towards the pinning piece
+        BaseGameState.__init__(self, fen, move_cache)
+
+
+    """
+    Take over board and find the kings and piece counts on it.
+    """
+
+
+    def placePieces(self, board):
+        self.board = board
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] == "wK":
+                    self.white_king_location = (row, col)
+                elif self.board[row][col] == "bK":
+                    self.black_king_location = (row, col)
+        self.piece_counts = countPieces(self.board) # indexed by piece code
+
+
+    """
+    Move the pieces of a move on the board, including castling, pawn promotion and en passant.
+    """
+
+
+    def movePieces(self, code):
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        self.board[start_row][start_col] = "--"
+        self.board[end_row][end_col] = piece_moved
+        if (code >> 21) & 15:
+            self.piece_counts[(code >> 21) & 15] -= 1
+        # update king's location if moved
+        if piece_moved == "wK":
+            self.white_king_location = (end_row, end_col)
+        elif piece_moved == "bK":
+            self.black_king_location = (end_row, end_col)
             
-            # update the king's position if needed
-            if move.piece_moved == "wK":
-                self.white_king_location = (move.start_row, move.start_col)
-            elif move.piece_moved == "bK":
-                self.black_king_location = (move.start_row, move.start_col)
-            
-            # undo en passant move
-            if move.is_enpassant_move:
-                self.board[move.end_row][move.end_col] = "--" # leave landing square blank
-                self.board[move.start_row][move.end_col] = move.piece_captured
-                self.enpassant_possible = (move.end_row, move.end_col)
-            
-            # undo a 2 square pawn advance 
-            if move.piece_moved[1] == "P" and abs(move.start_row - move.end_row) == 2:
-                self.enpassant_possible = ()
+        # pawn promotion ~ the piece comes with the move, queen if none was chosen
+        if piece_moved[1] == "P" and (end_row == 0 or end_row == 7):
+            self.board[end_row][end_col] = piece_moved[0] + (PROMOTION_PIECES[(code >> 14) & 7] or "Q")
+            self.piece_counts[(code >> 17) & 15] -= 1
+            self.piece_counts[PIECE_CODES[self.board[end_row][end_col]]] += 1
             
-            # undo castle move
-            if move.is_castle_move:
-                if move.end_col - move.start_col == 2:  # kingside
-                    self.board[move.end_row][move.end_col+1] = self.board[move.end_row][move.end_col-1]
-                    self.board[move.end_row][move.end_col-1] = "--"
-                else:   # queenside
-                    self.board[move.end_row][move.end_col-2] = self.board[move.end_row][move.end_col+1]
-                    self.board[move.end_row][move.end_col+1] = "--"
-
-            # undo castling rights
-            self.castle_rights_log.pop()    # get rid of the new castle rights from the move we are undoing
-            self.current_castling_rights = self.castle_rights_log[-1]    # set the current castle rights to the last one in the list
+        # en passant move
+        if code & MOVE_ENPASSANT:
+            self.board[start_row][end_col] = "--" # capturing the pawn
+        
+        # castle move
+        if code & MOVE_CASTLE:
+            if end_col - start_col == 2:  # kingside castle move
+                self.board[end_row][end_col-1] = self.board[end_row][end_col+1] # moves the rook
+                self.board[end_row][end_col+1] = "--" # erase old rook 
+            else:   # queenside castle move
+                self.board[end_row][end_col+1] = self.board[end_row][end_col-2] # moves the rook
+                self.board[end_row][end_col-2] = "--" # erase old rook
+
 
-    
     """
-    Update the castle rights given the move.
+    Put the pieces of a move back where they were before movePieces.
     """
 
 
-    def updateCastleRights(self, move):
-        if move.piece_moved == "wK":
-            self.current_castling_rights.wks = False
-            self.current_castling_rights.wqs = False
-        elif move.piece_moved == "bK":
-            self.current_castling_rights.bks = False
-            self.current_castling_rights.bqs = False
-        elif move.piece_moved == "wR":
-            if move.start_row == 7:
-                if move.start_col == 0: # left rook
-                    self.current_castling_rights.wqs = False
-                elif move.start_col == 7:   # right rook
-                    self.current_castling_rights.wks = False
-        elif move.piece_moved == "bR":
-            if move.start_row == 0:
-                if move.start_col == 0: # left rook
-                    self.current_castling_rights.bqs = False
-                elif move.start_col == 7:   # right rook
-                    self.current_castling_rights.bks = False
+    def takeBackPieces(self, code):
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        piece_moved = CODE_PIECES[(code >> 17) & 15]
+        piece_captured = CODE_PIECES[(code >> 21) & 15]
+        if self.board[end_row][end_col] != piece_moved: # undo a promotion
+            self.piece_counts[PIECE_CODES[self.board[end_row][end_col]]] -= 1
+            self.piece_counts[(code >> 17) & 15] += 1
+        if (code >> 21) & 15:
+            self.piece_counts[(code >> 21) & 15] += 1
+        self.board[start_row][start_col] = piece_moved
+        self.board[end_row][end_col] = piece_captured
+        
+        # update the king's position if needed
+        if piece_moved == "wK":
+            self.white_king_location = (start_row, start_col)
+        elif piece_moved == "bK":
+            self.black_king_location = (start_row, start_col)
+        
+        # undo en passant move
+        if code & MOVE_ENPASSANT:
+            self.board[end_row][end_col] = "--" # leave landing square blank
+            self.board[start_row][end_col] = piece_captured
+        
+        # undo castle move
+        if code & MOVE_CASTLE:
+            if end_col - start_col == 2:  # kingside
+                self.board[end_row][end_col+1] = self.board[end_row][end_col-1]
+                self.board[end_row][end_col-1] = "--"
+            else:   # queenside
+                self.board[end_row][end_col-2] = self.board[end_row][end_col+1]
+                self.board[end_row][end_col+1] = "--"
 
 
     """
-    All moves considering checks.
+    Generate the legal moves of the position, without looking at the cache or setting the game status flags.
     """
 
 
-    def getValidMoves(self):
+    def generateMoveCodes(self):
         # advanced algorithm
         moves = []
-        self.in_check, self.pins, self.checks = self.checkForPinsAndChecks()
-        temp_castle_rights = CastleRights(self.current_castling_rights.wks, self.current_castling_rights.bks,
-                                          self.current_castling_rights.wqs, self.current_castling_rights.bqs)
+        # pins and checks are found once per position, the generators look pins up by square
+        self.in_check, pins, self.checks = self.checkForPinsAndChecks()
+        self.pins = {(pin[0], pin[1]): (pin[2], pin[3]) for pin in pins}
 
         if self.white_to_move: 
             king_row = self.white_king_location[0]
@@ -180,21 +882,24 @@ class GameState():
                 check_row = check[0]
                 check_col = check[1]
                 piece_checking = self.board[check_row][check_col]
-                valid_squares = [] # squares that pieces can move to
+                valid_squares = set() # squares that pieces can move to
                 # if knight, must capture the knight or move your king, other pieces can be blocked
                 if piece_checking[1] == "N":
-                    valid_squares = [(check_row, check_col)]
+                    valid_squares.add((check_row, check_col))
                 else:
                     for i in range(1, 8):
                         valid_square = (king_row + check[2] * i, king_col + check[3] * i) # check[2] and check[3] are the check directions
-                        valid_squares.append(valid_square)
+                        valid_squares.add(valid_square)
                         if valid_square[0] == check_row and valid_square[1] == check_col: # once you get to piece and check
                             break
                 # get rid of any moves that don't block check or move king
                 for i in range(len(moves)-1, -1, -1): # iterate through the list backwards when removing elements
-                    if moves[i].piece_moved[1] != "K": # move doesn't move king so it must block or capture
-                        if not (moves[i].end_row, moves[i].end_col) in valid_squares: # move doesn't block or capture piece
-                            moves.remove(moves[i])
+                    code = moves[i]
+                    if CODE_PIECES[(code >> 17) & 15][1] != "K": # move doesn't move king so it must block or capture
+                        if not ((code >> 9) & 7, (code >> 6) & 7) in valid_squares: # move doesn't block or capture piece
+                            # en passant lands behind the checking pawn but still captures it
+                            if not (code & MOVE_ENPASSANT and (code >> 3) & 7 == check_row and (code >> 6) & 7 == check_col):
+                                del moves[i]
             else: # double check, king has to move
                 self.getKingMoves(king_row, king_col, moves)
         else: # not in check - all moves are fine
@@ -203,18 +908,168 @@ class GameState():
                 self.getCastleMoves(self.white_king_location[0], self.white_king_location[1], moves)
             else:
                 self.getCastleMoves(self.black_king_location[0], self.black_king_location[1], moves)
-        self.current_castling_rights = temp_castle_rights
-        
-        if len(moves) == 0:
-            if self.inCheck():
-                self.checkmate = True
+        return moves
+
+
+    """
+    What isLegalMove needs to know about the position: (in_check, pins, checks, squares that stop a single check).
+    Also sets in_check.
+    """
+
+
+    def legalityContext(self):
+        in_check, pins, checks = self.checkForPinsAndChecks()
+        self.in_check = in_check
+        block_squares = set()
+        if len(checks) == 1:
+            check_row, check_col, d_row, d_col = checks[0]
+            king_row, king_col = self.white_king_location if self.white_to_move else self.black_king_location
+            if self.board[check_row][check_col][1] == "N":
+                block_squares.add((check_row, check_col))
             else:
-                self.stalemate = True
+                for i in range(1, 8):
+                    block_squares.add((king_row + d_row * i, king_col + d_col * i))
+                    if king_row + d_row * i == check_row and king_col + d_col * i == check_col:
+                        break
+        return in_check, {(pin[0], pin[1]): (pin[2], pin[3]) for pin in pins}, checks, block_squares
+
+
+    """
+    Pseudo-legal moves of one stage: captures, en passant and promotions when captures is True,
+    the other pawn pushes, piece moves to empty squares and castling otherwise.
+    """
+
+
+    def generateStageCodes(self, context, captures):
+        in_check, pins, checks = context[0], context[1], context[2]
+        board = self.board
+        ally_color = "w" if self.white_to_move else "b"
+        enemy_color = "b" if self.white_to_move else "w"
+        king_row, king_col = self.white_king_location if self.white_to_move else self.black_king_location
+        moves = []
+        if len(checks) > 1: # double check, only the king can move
+            pieces = [(king_row, king_col)]
         else:
-            self.checkmate = False
-            self.stalemate = False
-        
+            pieces = [(row, col) for row in range(8) for col in range(8) if board[row][col][0] == ally_color]
+        for row, col in pieces:
+            piece_type = board[row][col][1]
+            if piece_type == "P":
+                self.getPawnStageMoves(row, col, moves, captures)
+            elif piece_type == "N" or piece_type == "K":
+                for end_row, end_col in (KNIGHT_TABLE if piece_type == "N" else KING_TABLE)[row][col]:
+                    end_piece = board[end_row][end_col]
+                    if (end_piece[0] == enemy_color) if captures else (end_piece == "--"):
+                        moves.append(encodeMove(row, col, end_row, end_col, board))
+            else:
+                rays = RAY_TABLE[row][col]
+                for j in (range(4) if piece_type == "R" else range(4, 8) if piece_type == "B" else range(8)):
+                    for end_row, end_col in rays[j]:
+                        end_piece = board[end_row][end_col]
+                        if end_piece == "--":
+                            if not captures:
+                                moves.append(encodeMove(row, col, end_row, end_col, board))
+                            continue
+                        if captures and end_piece[0] == enemy_color:
+                            moves.append(encodeMove(row, col, end_row, end_col, board))
+                        break
+        if not captures and not in_check:
+            self.getCastleMoves(king_row, king_col, moves)
         return moves
+
+
+    def getPawnStageMoves(self, row, col, moves, captures):
+        board = self.board
+        move_amount, start_row, enemy_color = (-1, 6, "b") if self.white_to_move else (1, 1, "w")
+        end_row = row + move_amount
+        promotion = end_row == 0 or end_row == 7
+        if captures:
+            if promotion and board[end_row][col] == "--":
+                appendPawnMove(moves, encodeMove(row, col, end_row, col, board))
+            for end_col in (col - 1, col + 1):
+                if 0 <= end_col <= 7:
+                    if board[end_row][end_col][0] == enemy_color:
+                        appendPawnMove(moves, encodeMove(row, col, end_row, end_col, board))
+                    elif (end_row, end_col) == self.enpassant_possible:
+                        moves.append(encodeMove(row, col, end_row, end_col, board, MOVE_ENPASSANT))
+        elif not promotion and board[end_row][col] == "--":
+            moves.append(encodeMove(row, col, end_row, col, board))
+            if row == start_row and board[end_row + move_amount][col] == "--":
+                moves.append(encodeMove(row, col, end_row + move_amount, col, board))
+
+
+    """
+    Whether a pseudo-legal move leaves the king safe, using a context from legalityContext for this position.
+    """
+
+
+    def isLegalMove(self, code, context):
+        in_check, pins, checks, block_squares = context
+        if code & MOVE_CASTLE:
+            return not in_check # castles are only generated after checking every square the king crosses
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        piece_type = CODE_PIECES[(code >> 17) & 15][1]
+        if piece_type == "K":
+            # lift the king off the board so a slider checking along the line still attacks the square behind it
+            king = self.board[start_row][start_col]
+            self.board[start_row][start_col] = "--"
+            attacked = self.squareUnderAttack(end_row, end_col)
+            self.board[start_row][start_col] = king
+            return not attacked
+        if len(checks) > 1:
+            return False
+        pin_direction = pins.get((start_row, start_col))
+        if pin_direction is not None:
+            if piece_type == "N":
+                return False
+            direction = ((end_row > start_row) - (end_row < start_row), (end_col > start_col) - (end_col < start_col))
+            if direction != pin_direction and direction != (-pin_direction[0], -pin_direction[1]):
+                return False
+        if code & MOVE_ENPASSANT:
+            if self.enpassantExposesKing(start_row, start_col, end_col):
+                return False
+            # the pawn lands behind the checking pawn but still captures it
+            return not in_check or (end_row, end_col) in block_squares or (start_row, end_col) == checks[0][:2]
+        return not in_check or (end_row, end_col) in block_squares
+
+
+    """
+    Whether a move found in another position (a hash or killer move) is a pseudo-legal move of this one:
+    the same piece on the start square, the same piece (or nothing) on the end square and a clear path.
+    """
+
+
+    def isPseudoLegal(self, code):
+        board = self.board
+        start_row, start_col, end_row, end_col = (code >> 3) & 7, code & 7, (code >> 9) & 7, (code >> 6) & 7
+        piece = CODE_PIECES[(code >> 17) & 15]
+        if board[start_row][start_col] != piece or piece[0] != ("w" if self.white_to_move else "b"):
+            return False
+        if code & MOVE_CASTLE:
+            castles = []
+            self.getCastleMoves(start_row, start_col, castles)
+            return code in castles
+        if code & MOVE_ENPASSANT:
+            return (end_row, end_col) == self.enpassant_possible
+        if board[end_row][end_col] != CODE_PIECES[(code >> 21) & 15]:
+            return False
+        if piece[1] in "PBRQ": # squares in between have to be empty, for pawns this only matters on a 2 square push
+            d_row = (end_row > start_row) - (end_row < start_row)
+            d_col = (end_col > start_col) - (end_col < start_col)
+            row, col = start_row + d_row, start_col + d_col
+            while (row, col) != (end_row, end_col):
+                if board[row][col] != "--":
+                    return False
+                row, col = row + d_row, col + d_col
+        return True
+
+
+    """
+    Whether neither side has enough material left to checkmate, from the piece counts kept by movePieces.
+    """
+
+
+    def materialDraw(self):
+        return insufficientMaterial(self.piece_counts, self.board)
     
 
     """
@@ -231,17 +1086,72 @@ class GameState():
 
     """
     Determine if enemy can attack the square row col.
+    Looks outward from the square along the precomputed rays and knight jumps, so no moves are generated.
     """
 
     
     def squareUnderAttack(self, row, col):
-        self.white_to_move = not self.white_to_move # switch to oponent's point of wiev
-        opponents_moves = self.getAllPossibleMoves()
-        self.white_to_move = not self.white_to_move
-        for move in opponents_moves:
-            if move.end_row == row and move.end_col == col: # square is under attack
+        enemy_color = "b" if self.white_to_move else "w"
+        board = self.board
+        for end_row, end_col in KNIGHT_TABLE[row][col]:
+            if board[end_row][end_col] == enemy_color + "N":
                 return True
+        rays = RAY_TABLE[row][col]
+        for j in range(8):
+            i = 0
+            for end_row, end_col in rays[j]:
+                end_piece = board[end_row][end_col]
+                if end_piece != "--":
+                    if end_piece[0] == enemy_color:
+                        enemy_type = end_piece[1]
+                        # same conditions as checkForPinsAndChecks: rook orthogonally, bishop diagonally, queen anywhere,
+                        # king or pawn (only from the side it captures towards) 1 square away
+                        if (enemy_type == "Q") or (j <= 3 and enemy_type == "R") or (j >= 4 and enemy_type == "B") or \
+                                (i == 0 and (enemy_type == "K" or (enemy_type == "P" and ((enemy_color == "w" and j >= 6) or (enemy_color == "b" and 4 <= j <= 5))))):
+                            return True
+                    break
+                i += 1
         return False
+
+
+    """
+    Determine which of the given squares the enemy attacks, in one pass over the enemy pieces.
+    Returns the set of attacked (row, col) squares.
+    """
+
+
+    def squaresUnderAttack(self, squares):
+        enemy_color = "b" if self.white_to_move else "w"
+        board = self.board
+        targets = set(squares)
+        attacked = set()
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece[0] != enemy_color:
+                    continue
+                piece_type = piece[1]
+                if piece_type == "P":
+                    pawn_row = row + (-1 if enemy_color == "w" else 1)
+                    attacks = [(pawn_row, pawn_col) for pawn_col in (col - 1, col + 1) if 0 <= pawn_row <= 7 and 0 <= pawn_col <= 7]
+                elif piece_type == "N":
+                    attacks = KNIGHT_TABLE[row][col]
+                elif piece_type == "K":
+                    attacks = KING_TABLE[row][col]
+                else:
+                    attacks = []
+                    rays = RAY_TABLE[row][col]
+                    for j in (range(4) if piece_type == "R" else range(4, 8) if piece_type == "B" else range(8)):
+                        for end_row, end_col in rays[j]:
+                            attacks.append((end_row, end_col))
+                            if board[end_row][end_col] != "--":
+                                break
+                for square in attacks:
+                    if square in targets:
+                        attacked.add(square)
+                if len(attacked) == len(targets):
+                    return attacked
+        return attacked
     
     
     """
@@ -333,15 +1243,9 @@ class GameState():
 
 
     def getPawnMoves(self, row, col, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
-            
+        pin_direction = self.pins.get((row, col))
+        piece_pinned = pin_direction is not None
+
         if self.white_to_move:
             move_amount = -1
             start_row = 6
@@ -352,22 +1256,53 @@ class GameState():
             enemy_color = "w"
         
         if self.board[row+move_amount][col] == "--": # 1 square pawn advance
-            if not piece_pinned or pin_direction == (move_amount, 0):
-                moves.append(Move((row, col), (row + move_amount, col), self.board))
+            # a pawn pinned along its file can still push, away from the king or towards it
+            if not piece_pinned or pin_direction == (move_amount, 0) or pin_direction == (-move_amount, 0):
+                appendPawnMove(moves, encodeMove(row, col, row + move_amount, col, self.board))
                 if row == start_row and self.board[row + 2 * move_amount][col] == "--": # 2 square pawn advance
-                    moves.append(Move((row, col), (row + 2 * move_amount, col), self.board))
+                    moves.append(encodeMove(row, col, row + 2 * move_amount, col, self.board))
+        # a pawn pinned along a diagonal can still capture along it, away from the king or towards it
         if col - 1 >= 0: # capture to the left
-            if not piece_pinned or pin_direction == (move_amount, -1):
+            if not piece_pinned or pin_direction == (move_amount, -1) or pin_direction == (-move_amount, +1):
                 if self.board[row + move_amount][col - 1][0] == enemy_color:
-                    moves.append(Move((row, col), (row + move_amount, col - 1), self.board))
-                if (row + move_amount, col - 1) == self.enpassant_possible:
-                    moves.append(Move((row, col), (row + move_amount, col - 1), self.board, is_enpassant_move = True))
+                    appendPawnMove(moves, encodeMove(row, col, row + move_amount, col - 1, self.board))
+                if (row + move_amount, col - 1) == self.enpassant_possible and not self.enpassantExposesKing(row, col, col - 1):
+                    moves.append(encodeMove(row, col, row + move_amount, col - 1, self.board, MOVE_ENPASSANT))
         if col + 1 <= 7: # capture to the right
-            if not piece_pinned or pin_direction == (move_amount, +1):
+            if not piece_pinned or pin_direction == (move_amount, +1) or pin_direction == (-move_amount, -1):
                 if self.board[row + move_amount][col +1][0] == enemy_color:
-                    moves.append(Move((row, col), (row + move_amount, col + 1), self.board))
-                if (row + move_amount, col + 1) == self.enpassant_possible:
-                    moves.append(Move((row, col), (row + move_amount, col + 1), self.board, is_enpassant_move = True))
+                    appendPawnMove(moves, encodeMove(row, col, row + move_amount, col + 1, self.board))
+                if (row + move_amount, col + 1) == self.enpassant_possible and not self.enpassantExposesKing(row, col, col + 1):
+                    moves.append(encodeMove(row, col, row + move_amount, col + 1, self.board, MOVE_ENPASSANT))
+
+
+    """
+    En passant removes two pawns from the same row at once, which the pin detection can't see.
+    Returns True if that would open the row between the king and an enemy rook or queen.
+    """
+
+
+    def enpassantExposesKing(self, row, col, capture_col):
+        king_row, king_col = self.white_king_location if self.white_to_move else self.black_king_location
+        if king_row != row:
+            return False
+        enemy_color = "b" if self.white_to_move else "w"
+        left_col = min(col, capture_col)
+        right_col = max(col, capture_col)
+        if king_col < left_col:
+            inside = range(king_col + 1, left_col)
+            outside = range(right_col + 1, 8)
+        else:
+            inside = range(right_col + 1, king_col)
+            outside = range(left_col - 1, -1, -1)
+        for i in inside:
+            if self.board[row][i] != "--": # some other piece still blocks
+                return False
+        for i in outside:
+            piece = self.board[row][i]
+            if piece != "--":
+                return piece[0] == enemy_color and (piece[1] == "R" or piece[1] == "Q")
+        return False
                     
         
     """
@@ -376,16 +1311,9 @@ class GameState():
 
 
     def getRookMoves(self, row, col, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                if self.board[row][col][1] != "Q": # can't remove queen from pin on rook moves, only remove it on bishop moves
-                    self.pins.remove(self.pins[i])
-                break
-            
+        pin_direction = self.pins.get((row, col))
+        piece_pinned = pin_direction is not None
+
         directions = ((-1, 0), (0, -1), (1, 0), (0, 1)) # up, left, down, right
         enemy_color = "b" if self.white_to_move else "w"
         for direction in directions:
@@ -396,9 +1324,9 @@ class GameState():
                     if not piece_pinned or pin_direction == direction or pin_direction == (-direction[0], -direction[1]):
                         end_piece = self.board[end_row][end_col]
                         if end_piece == "--": # empty space is valid
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
+                            moves.append(encodeMove(row, col, end_row, end_col, self.board))
                         elif end_piece[0] == enemy_color: # capture enemy piece
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
+                            moves.append(encodeMove(row, col, end_row, end_col, self.board))
                             break
                         else: # friendly piece
                             break
@@ -412,23 +1340,18 @@ class GameState():
 
 
     def getKnightMoves(self, row, col, moves):
-        piece_pinned = False
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                self.pins.remove(self.pins[i])
-                break
-        
+        if (row, col) in self.pins: # a pinned knight can never move
+            return
+
         knight_moves = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2)) # up/left up/right right/up right/down down/left down/right left/up left/down
         ally_color = "w" if self.white_to_move else "b"
         for move in knight_moves:
             end_row = row + move[0]
             end_col = col + move[1]
             if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                if not piece_pinned:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece[0] != ally_color: # so it's either enemy piece or empty equare 
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
+                end_piece = self.board[end_row][end_col]
+                if end_piece[0] != ally_color: # so it's either enemy piece or empty equare 
+                    moves.append(encodeMove(row, col, end_row, end_col, self.board))
                     
     
     """
@@ -437,15 +1360,9 @@ class GameState():
 
 
     def getBishopMoves(self, row, col, moves):
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == row and self.pins[i][1] == col:
-                piece_pinned = True
-                pin_direction = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
-                break
-    
+        pin_direction = self.pins.get((row, col))
+        piece_pinned = pin_direction is not None
+
         directions = ((-1, -1), (-1, 1), (1, 1), (1, -1)) # digaonals: up/left up/right down/right down/left
         enemy_color = "b" if self.white_to_move else "w"    
         for direction in directions:
@@ -456,9 +1373,9 @@ class GameState():
                     if not piece_pinned or pin_direction == direction or pin_direction == (-direction[0], -direction[1]):
                         end_piece = self.board[end_row][end_col]
                         if end_piece == "--": # empty space is valid
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
+                            moves.append(encodeMove(row, col, end_row, end_col, self.board))
                         elif end_piece[0] == enemy_color: # capture enemy piece
-                            moves.append(Move((row, col), (end_row, end_col), self.board))
+                            moves.append(encodeMove(row, col, end_row, end_col, self.board))
                             break
                         else: # friendly piece
                             break
@@ -482,51 +1399,50 @@ class GameState():
 
 
     def getKingMoves(self, row, col, moves):
-        row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
-        col_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
         ally_color = "w" if self.white_to_move else "b"
-        for i in range(8):
-            end_row = row + row_moves[i]
-            end_col = col + col_moves[i]
-            if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color: # not an ally piece - empty or enemy
-                    # place king on end square and check for checks
-                    if ally_color == "w":
-                        self.white_king_location = (end_row, end_col)
-                    else:
-                        self.black_king_location = (end_row, end_col)
-                    in_check, pins, checks = self.checkForPinsAndChecks()
-                    if not in_check:
-                        moves.append(Move((row, col), (end_row, end_col), self.board))
-                    # place king back on original location
-                    if ally_color == "w":
-                        self.white_king_location = (row, col)
-                    else:
-                        self.black_king_location = (row, col)
+        king = self.board[row][col]
+        # lift the king off the board while testing its destinations so a slider checking along the line
+        # still attacks the square behind it
+        self.board[row][col] = "--"
+        safe_squares = [(end_row, end_col) for end_row, end_col in KING_TABLE[row][col]
+                        if self.board[end_row][end_col][0] != ally_color and not self.squareUnderAttack(end_row, end_col)]
+        self.board[row][col] = king
+        for end_row, end_col in safe_squares: # empty or enemy square the king can't be attacked on
+            moves.append(encodeMove(row, col, end_row, end_col, self.board))
 
 
     """
     Generate all valid castle moves for the king at (rol, col) and add them to the list of moves.
+    All the squares that have to be safe are checked with a single squaresUnderAttack call.
     """
 
     def getCastleMoves(self, row, col, moves):
-        if self.squareUnderAttack(row, col):
+        kingside = (self.white_to_move and self.current_castling_rights.wks) or (not self.white_to_move and self.current_castling_rights.bks)
+        queenside = (self.white_to_move and self.current_castling_rights.wqs) or (not self.white_to_move and self.current_castling_rights.bqs)
+        kingside = kingside and self.board[row][col+1] == "--" and self.board[row][col+2] == "--"
+        queenside = queenside and self.board[row][col-1] == "--" and self.board[row][col-2] == "--" and self.board[row][col-3] == "--"
+        if not kingside and not queenside:
+            return
+        squares = [(row, col)]
+        if kingside:
+            squares += [(row, col+1), (row, col+2)]
+        if queenside:
+            squares += [(row, col-1), (row, col-2)]
+        attacked = self.squaresUnderAttack(squares)
+        if (row, col) in attacked:
             return # can't castle while we are in check
-        if (self.white_to_move and self.current_castling_rights.wks) or (not self.white_to_move and self.current_castling_rights.bks):
-            self.getKingsideCastleMoves(row, col, moves)
-        if (self.white_to_move and self.current_castling_rights.wqs) or (not self.white_to_move and self.current_castling_rights.bqs):
-            self.getQueensideCastleMoves(row, col, moves)
+        if kingside:
+            self.getKingsideCastleMoves(row, col, moves, attacked)
+        if queenside:
+            self.getQueensideCastleMoves(row, col, moves, attacked)
         
-    def getKingsideCastleMoves(self, row, col, moves):
-        if self.board[row][col+1] == "--" and self.board[row][col+2] == "--":
-            if not self.squareUnderAttack(row, col+1) and not self.squareUnderAttack(row, col+2):
-                moves.append(Move((row, col), (row, col+2), self.board, is_castle_move=True))
+    def getKingsideCastleMoves(self, row, col, moves, attacked):
+        if (row, col+1) not in attacked and (row, col+2) not in attacked:
+            moves.append(encodeMove(row, col, row, col+2, self.board, MOVE_CASTLE))
 
-    def getQueensideCastleMoves(self, row, col, moves):
-        if self.board[row][col-1] == "--" and self.board[row][col-2] == "--" and self.board[row][col-3] == "--":
-            if not self.squareUnderAttack(row, col-1) and not self.squareUnderAttack(row, col-2):
-                moves.append(Move((row, col), (row, col-2), self.board, is_castle_move=True))
+    def getQueensideCastleMoves(self, row, col, moves, attacked):
+        if (row, col-1) not in attacked and (row, col-2) not in attacked:
+            moves.append(encodeMove(row, col, row, col-2, self.board, MOVE_CASTLE))
 
 
 class CastleRights():
@@ -552,27 +1468,49 @@ class Move():
                      "e": 4, "f": 5, "g": 6, "h": 7}
     cols_to_files = {v: k for k, v in files_to_cols.items()}
 
+    # a Move is only a view of a packed move int, __slots__ keeps it small and cheap to create
+    __slots__ = ("start_row", "start_col", "end_row", "end_col", "piece_moved", "piece_captured",
+                 "is_pawn_promotion", "promotion_piece", "is_enpassant_move", "is_castle_move", "move_code", "moveID")
+
     
-    def __init__(self, start_square, end_square, board, is_enpassant_move = False, is_castle_move = False):
-        self.start_row = start_square[0]
-        self.start_col = start_square[1]
-        self.end_row = end_square[0]
-        self.end_col = end_square[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
+    def __init__(self, start_square, end_square, board, is_enpassant_move = False, is_castle_move = False, promotion_piece = ""):
+        flags = (MOVE_ENPASSANT if is_enpassant_move else 0) | (MOVE_CASTLE if is_castle_move else 0)
+        flags |= PROMOTION_PIECES.index(promotion_piece) << 14
+        self.setCode(encodeMove(start_square[0], start_square[1], end_square[0], end_square[1], board, flags))
+
+
+    """
+    Build a Move from a packed move int, without needing the board.
+    """
+
+
+    @classmethod
+    def fromCode(cls, code):
+        move = cls.__new__(cls)
+        move.setCode(code)
+        return move
+
+
+    def setCode(self, code):
+        self.move_code = code
+        self.start_row = (code >> 3) & 7
+        self.start_col = code & 7
+        self.end_row = (code >> 9) & 7
+        self.end_col = (code >> 6) & 7
+        self.piece_moved = CODE_PIECES[(code >> 17) & 15]
+        self.piece_captured = CODE_PIECES[(code >> 21) & 15]
 
         # pawn promotion
         self.is_pawn_promotion = (self.piece_moved == "wP" and self.end_row == 0) or (self.piece_moved == "bP" and self.end_row == 7)   
+        self.promotion_piece = PROMOTION_PIECES[(code >> 14) & 7] # "Q", "R", "B", "N" or "" if none was chosen
 
         # en passant
-        self.is_enpassant_move = is_enpassant_move
-        if self.is_enpassant_move:
-            self.piece_captured = "wP" if self.piece_moved == "bP" else "bP"
+        self.is_enpassant_move = code & MOVE_ENPASSANT != 0
             
         # castle move
-        self.is_castle_move = is_castle_move
+        self.is_castle_move = code & MOVE_CASTLE != 0
 
-        self.moveID = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col 
+        self.moveID = code & MOVE_ID_MASK # start and end square plus the promotion piece
 
     
     """
@@ -584,33 +1522,95 @@ class Move():
         if isinstance(other, Move):
             return self.moveID == other.moveID
         return False
+
+
+    def __hash__(self):
+        return self.moveID
             
         
+    """
+    Short readable notation, e.g. "Nf3", "Bxc6", "exd5", "e8Q", "0-0" or "exd6 e.p.".
+    It isn't full SAN (no disambiguation or check marks), see ChessPgn.getSan for that.
+    """
+
+
     def getChessNotation(self):
-        output_string = ""
-        if self.is_pawn_promotion:
-            output_string += self.getRankFile(self.end_row, self.end_col) + "Q"
         if self.is_castle_move:
-            if self.end_col == 1:
-                output_string += "0-0-0"
-            else:
-                output_string += "0-0"
-        if self.is_enpassant_move:
-            output_string += self.getRankFile(self.start_row, self.start_col)[0] + "x" + self.getRankFile(self.end_row, self.end_col) + " e.p."
-        if self.piece_captured != "--":
-            if self.piece_moved[1] == "p":
-                output_string += self.getRankFile(self.start_row, self.start_col)[0] + "x" + self.getRankFile(self.end_row, self.end_col)
-            else:
-                output_string += self.piece_moved[1] + "x" + self.getRankFile(self.end_row, self.end_col)
-        else:
-            if self.piece_moved[1] == "p":
-                output_string += self.getRankFile(self.end_row, self.end_col)
-            else:
-                output_string += self.piece_moved[1] + self.getRankFile(self.end_row, self.end_col)
-        
-        return output_string
+            return "0-0" if self.end_col == 6 else "0-0-0"
+        end_square = self.getRankFile(self.end_row, self.end_col)
+        capture = self.piece_captured != "--" or self.is_enpassant_move
+        if self.piece_moved[1] == "P":
+            output_string = (self.cols_to_files[self.start_col] + "x" if capture else "") + end_square
+            if self.is_pawn_promotion:
+                output_string += self.promotion_piece or "Q"
+            if self.is_enpassant_move:
+                output_string += " e.p."
+            return output_string
+        return self.piece_moved[1] + ("x" if capture else "") + end_square
+
 
-    
-    
     def getRankFile(self, row, col):
-        return self.cols_to_files[col] + self.rows_to_ranks[row]
\ No newline at end of file
+        return self.cols_to_files[col] + self.rows_to_ranks[row]
+
+
+    """
+    UCI long algebraic notation, e.g. "e2e4" or "e7e8q".
+    """
+
+
+    def getUciNotation(self):
+        return self.getRankFile(self.start_row, self.start_col) + self.getRankFile(self.end_row, self.end_col) + self.promotion_piece.lower()
+
+"""
+The legal moves of a position as Move objects.
+Still a plain list for iteration and indexing, but also indexed by moveID (start, end and promotion piece)
+and grouped by start square so the UI and move parsers can look moves up without scanning the whole list.
+The indexes are built once, the list is meant to be read only.
+"""
+
+
+class MoveList(list):
+    def __init__(self, codes=()):
+        super().__init__(Move.fromCode(code) for code in codes)
+        self.by_id = {}
+        self.by_square = {}
+        for move in self:
+            self.by_id[move.moveID] = move
+            square = (move.start_row, move.start_col)
+            if square in self.by_square:
+                self.by_square[square].append(move)
+            else:
+                self.by_square[square] = [move]
+
+
+    def __contains__(self, move):
+        return isinstance(move, Move) and move.moveID in self.by_id
+
+
+    """
+    Returns the generated move equal to move (same start, end and promotion piece), or None if it isn't legal.
+    """
+
+
+    def get(self, move):
+        return self.by_id.get(move.moveID)
+
+
+    """
+    Returns the legal move from start_square to end_square (both (row, col)), or None.
+    """
+
+
+    def find(self, start_square, end_square, promotion_piece=""):
+        move_id = (start_square[0] * 8 + start_square[1]) | ((end_square[0] * 8 + end_square[1]) << 6) \
+                  | (PROMOTION_PIECES.index(promotion_piece) << 14)
+        return self.by_id.get(move_id)
+
+
+    """
+    All legal moves of the piece on (row, col).
+    """
+
+
+    def fromSquare(self, row, col):
+        return self.by_square.get((row, col), [])
@@ -0,0 +1,131 @@
+"""
+Static evaluation.
+The base score is material plus piece-square tables. GameState keeps it up to date in makeMove/undoMove
+(GameState.score, from white's point of view), so evaluating a leaf is a field read.
+Extra terms that can't be updated incrementally (mobility, king safety, ...) are registered with registerTerm
+and added on top by evaluate.
+This module doesn't import the engine, ChessEngine builds its lookup tables from PIECE_SQUARE_SCORES.
+"""
+
+
+PIECE_VALUES = {"K": 0, "Q": 900, "R": 500, "B": 330, "N": 320, "P": 100}
+
+# bonus for a white piece on each square, rows in board order (row 0 is the 8th rank),
+# black uses the same tables mirrored vertically
+PIECE_SQUARE_TABLES = {
+    "P": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [50, 50, 50, 50, 50, 50, 50, 50],
+        [10, 10, 20, 30, 30, 20, 10, 10],
+        [5, 5, 10, 25, 25, 10, 5, 5],
+        [0, 0, 0, 20, 20, 0, 0, 0],
+        [5, -5, -10, 0, 0, -10, -5, 5],
+        [5, 10, 10, -20, -20, 10, 10, 5],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    "N": [
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+        [-40, -20, 0, 0, 0, 0, -20, -40],
+        [-30, 0, 10, 15, 15, 10, 0, -30],
+        [-30, 5, 15, 20, 20, 15, 5, -30],
+        [-30, 0, 15, 20, 20, 15, 0, -30],
+        [-30, 5, 10, 15, 15, 10, 5, -30],
+        [-40, -20, 0, 5, 5, 0, -20, -40],
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+    ],
+    "B": [
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 10, 10, 5, 0, -10],
+        [-10, 5, 5, 10, 10, 5, 5, -10],
+        [-10, 0, 10, 10, 10, 10, 0, -10],
+        [-10, 10, 10, 10, 10, 10, 10, -10],
+        [-10, 5, 0, 0, 0, 0, 5, -10],
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+    ],
+    "R": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 10, 10, 10, 10, 10, 10, 5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [0, 0, 0, 5, 5, 0, 0, 0],
+    ],
+    "Q": [
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 5, 5, 5, 0, -10],
+        [-5, 0, 5, 5, 5, 5, 0, -5],
+        [0, 0, 5, 5, 5, 5, 0, -5],
+        [-10, 5, 5, 5, 5, 5, 0, -10],
+        [-10, 0, 5, 0, 0, 0, 0, -10],
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+    ],
+    "K": [
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-20, -30, -30, -40, -40, -30, -30, -20],
+        [-10, -20, -20, -20, -20, -20, -20, -10],
+        [20, 20, 0, 0, 0, 0, 20, 20],
+        [20, 30, 10, 0, 0, 10, 30, 20],
+    ],
+}
+
+
+def _buildPieceSquareScores():
+    scores = {}
+    for piece_type, table in PIECE_SQUARE_TABLES.items():
+        value = PIECE_VALUES[piece_type]
+        scores["w" + piece_type] = [value + table[square // 8][square % 8] for square in range(64)]
+        scores["b" + piece_type] = [-(value + table[7 - square // 8][square % 8]) for square in range(64)]
+    return scores
+
+
+PIECE_SQUARE_SCORES = _buildPieceSquareScores() # "wN" -> 64 scores indexed by row * 8 + col, negative for black
+
+
+"""
+Material and piece-square score of a board from white's point of view, computed from scratch.
+"""
+
+
+def scoreBoard(board):
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece != "--":
+                score += PIECE_SQUARE_SCORES[piece][row * 8 + col]
+    return score
+
+
+"""
+Extra evaluation terms: name -> (function(game_state) returning a score from white's point of view, weight).
+"""
+
+
+TERMS = {}
+
+
+def registerTerm(name, function, weight=1):
+    TERMS[name] = (function, weight)
+
+
+def unregisterTerm(name):
+    TERMS.pop(name, None)
+
+
+"""
+Evaluate the position from the point of view of the side to move: the incremental score plus every registered term.
+"""
+
+
+def evaluate(game_state):
+    score = game_state.score
+    for function, weight in TERMS.values():
+        score += weight * function(game_state)
+    return score if game_state.white_to_move else -score
@@ -0,0 +1,191 @@
+"""
+Batch feature extraction and evaluation over many positions with NumPy, for training data and offline analysis.
+Positions (GameState / BitboardGameState objects, Snapshots or FEN strings) are packed into an N x 64 int8 array of
+piece codes (see ChessEngine.CODE_PIECES, 0 = empty, square = row * 8 + col) and everything else is computed on
+that array with vectorized operations:
+    piece planes      N x 12 x 64 uint8, one plane per piece in CODE_PIECES order ("wP" ... "bK")
+    material          N, from white's point of view
+    psq               N, material plus piece-square tables, equal to GameState.score
+    attacks           N x 2 x 64, number of white / black pieces attacking each square (sliders stop at the first piece)
+    mobility          N x 2, attacked squares not occupied by the side's own pieces, counted once per attacking piece
+NumPy is only needed by this module, the engine itself doesn't use it.
+
+Usage (from the repository root):
+    python Chess/ChessFeatures.py positions.fen --output features.npz
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ChessEngine import CODE_PIECES, DIRECTIONS, KNIGHT_OFFSETS, parseFen
+from ChessEvaluation import PIECE_VALUES, PIECE_SQUARE_SCORES
+
+
+MOBILITY_WEIGHT = 4 # centipawns per attacked square in evaluateBatch
+
+# (color char, type char) of a board string -> piece code, so whole boards can be decoded with one array lookup
+PIECE_LOOKUP = np.zeros((256, 256), dtype=np.int8)
+for _code, _piece in enumerate(CODE_PIECES):
+    PIECE_LOOKUP[ord(_piece[0]), ord(_piece[1])] = _code
+
+MATERIAL_VALUES = np.array([0] + [PIECE_VALUES[piece[1]] if piece[0] == "w" else -PIECE_VALUES[piece[1]]
+                                  for piece in CODE_PIECES[1:]], dtype=np.int32)
+PSQ_SCORES = np.zeros((len(CODE_PIECES), 64), dtype=np.int32) # [piece code][square], zero row for empty squares
+for _code, _piece in enumerate(CODE_PIECES[1:], 1):
+    PSQ_SCORES[_code] = PIECE_SQUARE_SCORES[_piece]
+SQUARES = np.arange(64)
+PLANE_CODES = np.arange(1, len(CODE_PIECES), dtype=np.int8)
+
+
+"""
+Pack positions into (squares, white_to_move): an N x 64 int8 array of piece codes and an N bool array.
+"""
+
+
+def packPositions(positions):
+    boards = []
+    sides = []
+    for position in positions:
+        if isinstance(position, str):
+            board, white_to_move = parseFen(position)[:2]
+        else:
+            board, white_to_move = position.board, position.white_to_move
+        boards.append("".join("".join(row) for row in board))
+        sides.append(white_to_move)
+    if not sides:
+        return np.zeros((0, 64), dtype=np.int8), np.zeros(0, dtype=bool)
+    chars = np.frombuffer("".join(boards).encode("ascii"), dtype=np.uint8).reshape(len(sides), 64, 2)
+    return PIECE_LOOKUP[chars[:, :, 0], chars[:, :, 1]], np.array(sides, dtype=bool)
+
+
+def piecePlanes(squares):
+    return (squares[:, None, :] == PLANE_CODES[None, :, None]).astype(np.uint8)
+
+
+def materialScores(squares):
+    return MATERIAL_VALUES[squares.astype(np.intp)].sum(axis=1)
+
+
+def pieceSquareScores(squares):
+    return PSQ_SCORES[squares.astype(np.intp), SQUARES].sum(axis=1)
+
+
+"""
+Move every (row, col) entry of an N x 8 x 8 array by (d_row, d_col), what falls off the board is dropped.
+"""
+
+
+def _shift(boards, d_row, d_col):
+    shifted = np.zeros_like(boards)
+    shifted[:, max(d_row, 0):8 + min(d_row, 0), max(d_col, 0):8 + min(d_col, 0)] = \
+        boards[:, max(-d_row, 0):8 + min(-d_row, 0), max(-d_col, 0):8 + min(-d_col, 0)]
+    return shifted
+
+
+"""
+Number of pieces of each side attacking every square, N x 2 x 64 (index 0 white, 1 black).
+Leapers are shifted planes, sliders are shifted one step at a time and only carry on through empty squares.
+"""
+
+
+def attackCounts(squares):
+    boards = squares.reshape(-1, 8, 8)
+    empty = (boards == 0).astype(np.int16)
+    attacks = np.zeros((len(boards), 2, 8, 8), dtype=np.int16)
+    for side in range(2):
+        offset = 6 * side # white codes are 1-6, black 7-12, in the order P N B R Q K
+        side_attacks = attacks[:, side]
+        pawns = (boards == offset + 1).astype(np.int16)
+        pawn_row = -1 if side == 0 else 1
+        side_attacks += _shift(pawns, pawn_row, -1) + _shift(pawns, pawn_row, 1)
+        knights = (boards == offset + 2).astype(np.int16)
+        for d_row, d_col in KNIGHT_OFFSETS:
+            side_attacks += _shift(knights, d_row, d_col)
+        kings = (boards == offset + 6).astype(np.int16)
+        queens = boards == offset + 5
+        orthogonal = ((boards == offset + 4) | queens).astype(np.int16)
+        diagonal = ((boards == offset + 3) | queens).astype(np.int16)
+        for j, (d_row, d_col) in enumerate(DIRECTIONS):
+            side_attacks += _shift(kings, d_row, d_col)
+            ray = orthogonal if j < 4 else diagonal # first 4 directions are orthogonal
+            for step in range(7):
+                ray = _shift(ray, d_row, d_col)
+                side_attacks += ray
+                ray = ray * empty
+                if not ray.any():
+                    break
+    return attacks.reshape(len(boards), 2, 64)
+
+
+"""
+Pseudo mobility per side, N x 2: attacks on squares not occupied by the side's own pieces.
+It ignores pins, checks and pawn pushes, it's meant as a cheap feature rather than a move count.
+"""
+
+
+def mobility(squares, attacks=None):
+    if attacks is None:
+        attacks = attackCounts(squares)
+    white_free = (squares == 0) | (squares >= 7)
+    black_free = (squares <= 6)
+    return np.stack([(attacks[:, 0] * white_free).sum(axis=1), (attacks[:, 1] * black_free).sum(axis=1)], axis=1)
+
+
+"""
+All features of a batch of positions as a dict of arrays (see the module docstring).
+"""
+
+
+def extractFeatures(positions):
+    squares, white_to_move = packPositions(positions)
+    attacks = attackCounts(squares)
+    return {
+        "squares": squares,
+        "white_to_move": white_to_move,
+        "planes": piecePlanes(squares),
+        "material": materialScores(squares),
+        "psq": pieceSquareScores(squares),
+        "attacks": attacks,
+        "mobility": mobility(squares, attacks),
+    }
+
+
+"""
+Evaluate a batch of positions from the side to move's point of view:
+the material and piece-square score of ChessEvaluation plus a mobility term.
+Terms registered with ChessEvaluation.registerTerm are plain Python and are not included.
+"""
+
+
+def evaluateBatch(positions, mobility_weight=MOBILITY_WEIGHT):
+    squares, white_to_move = packPositions(positions)
+    moves = mobility(squares)
+    scores = pieceSquareScores(squares) + mobility_weight * (moves[:, 0] - moves[:, 1])
+    return np.where(white_to_move, scores, -scores)
+
+
+def saveFeatures(path, features):
+    np.savez_compressed(path, **features)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract NumPy features from a file of FEN positions (one per line).")
+    parser.add_argument("input", help="file with one FEN per line")
+    parser.add_argument("--output", default="features.npz", help="compressed .npz file to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.input) as file:
+        features = extractFeatures(line.strip() for line in file if line.strip())
+    saveFeatures(args.output, features)
+    seconds = time.perf_counter() - start
+    count = len(features["squares"])
+    print("%d positions in %.3fs (%.0f positions/sec) -> %s" % (count, seconds, count / seconds if seconds > 0 else 0.0, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,13 +6,24 @@ Displaying current GameStatus object.
 
 import pygame as p
 import ChessEngine
+import ChessAI
+import ChessPgn
+import queue
 import sys
+import threading
+import time
 
 WIDTH = HEIGHT = 512
 DIMENSION = 8
 SQUARE_SIZE = HEIGHT // DIMENSION
 MAX_FPS = 60
+STATUS_HEIGHT = 24 # status bar under the board
 IMAGES = {}
+AI_TIME_LIMIT = 2 # seconds the computer may think per move
+MOVE_CACHE_SIZE = 4096 # positions whose legal moves are kept, so undo and redo don't regenerate them
+GAMES_FILE = "Chess/games.pgn" # finished games are appended here
+BOARD_COLORS = (p.Color("white"), p.Color("gray")) # light and dark squares, the top left square is light
+HIGHLIGHT_ALPHA = 100 # transparency of the highlight overlays -> 0 transparent; 255 opaque
 
 
 """
@@ -30,16 +41,21 @@ def loadImages():
 """
 The main driver for our code.
 This will handle user input and updating the graphics.
+Legal moves and computer moves come from an EngineWorker thread, the loop only handles events and draws,
+so the window keeps responding while the computer thinks.
 """
 
 
 def main():
     p.init()
-    screen = p.display.set_mode((WIDTH, HEIGHT))
+    screen = p.display.set_mode((WIDTH, HEIGHT + STATUS_HEIGHT))
     clock = p.time.Clock()
     screen.fill(p.Color("white"))
+    renderer = BoardRenderer(screen)
+    engine = EngineWorker()
     game_state = ChessEngine.GameState()
-    valid_moves = game_state.getValidMoves()
+    valid_moves = ChessEngine.MoveList() # filled in when the engine answers, no move can be played until then
+    engine.request("moves", game_state)
     move_made = False # flag variable for when a move is made
     animate = False # flag variable for when we should animate a move
     loadImages() # do this only once before while loop
@@ -47,26 +63,30 @@ def main():
     square_selected = () # no square is selected initially, this will keep track of the last click of the user (tuple(row,col))
     player_clicks = [] # this will keep track of player clicks (two tuples)
     game_over = False
-
-    white_did_check = ""
-    black_did_check = ""
-    last_move_printed = False
-    moves_list = []
-    
-    turn = 1
+    game_saved = False
+    player_one = True # True if a human is playing white, False if the computer is
+    player_two = True # same for black
+    thinking = None # SearchInfo of the computer's search in progress, for the status bar
+    idle = False # nothing changed last frame and the engine has nothing to do
 
     while running:
-        for e in p.event.get():  
+        human_turn = (game_state.white_to_move and player_one) or (not game_state.white_to_move and player_two)
+        events = p.event.get()
+        if not events and idle:
+            events = [p.event.wait()] # sleep until something happens instead of polling at MAX_FPS
+        for e in events:
             if e.type == p.QUIT:
                 running = False
                 p.quit()
                 sys.exit()
             # mouse handler            
             elif e.type == p.MOUSEBUTTONDOWN:
-                if not game_over:
+                if not game_over and human_turn:
                     location = p.mouse.get_pos() # (x, y) location of the mouse
                     col = location[0] // SQUARE_SIZE
                     row = location[1] // SQUARE_SIZE
+                    if row >= DIMENSION: # click on the status bar
+                        continue
                     if square_selected == (row, col): # user clicked the same square twice
                         square_selected = () # deselect
                         player_clicks = [] # clear clicks
@@ -74,218 +94,416 @@ def main():
                         square_selected = (row, col)
                         player_clicks.append(square_selected) # append for both 1st and 2nd click
                     if len(player_clicks) == 2: # after 2nd click                                                                    
-                        move = ChessEngine.Move(player_clicks[0], player_clicks[1], game_state.board)  
-                        for i in range(len(valid_moves)):
-                            if move == valid_moves[i]:
-                                game_state.makeMove(valid_moves[i])
-                                if game_state.checkForPinsAndChecks()[0]:
-                                    if not game_state.white_to_move:
-                                        white_did_check = "+"
-                                    else:
-                                        black_did_check = "+"
-                                move_made = True
-                                animate = True
-                                square_selected = () # reset user clicks
-                                player_clicks = [] 
-                                if game_state.white_to_move:
-                                    moves_list.append(f"\n{turn}. {game_state.move_log[-2].getChessNotation()}{white_did_check} {game_state.move_log[-1].getChessNotation()}{black_did_check}")
-                                    print(f"\n{turn}. {game_state.move_log[-2].getChessNotation()}{white_did_check} {game_state.move_log[-1].getChessNotation()}{black_did_check}", end= "")
-                                    turn += 1
-                                    white_did_check = ""
-                                    black_did_check = ""
+                        promotion_piece = ""
+                        if valid_moves.find(player_clicks[0], player_clicks[1], "Q") is not None: # pawn reaching the last row
+                            promotion_piece = choosePromotion(screen, game_state.board[player_clicks[0][0]][player_clicks[0][1]][0])
+                            renderer.invalidate()
+                        move = valid_moves.find(player_clicks[0], player_clicks[1], promotion_piece)
+                        if move is not None:
+                            game_state.makeMove(move)
+                            move_made = True
+                            animate = True
+                            square_selected = () # reset user clicks
+                            player_clicks = [] 
                         if not move_made:
                             player_clicks = [square_selected]
             
+            elif e.type == p.VIDEOEXPOSE: # the window was uncovered, its content may be gone
+                renderer.invalidate()
+            
             # key handler
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z: # undo when "z" is pressed
-                    if game_state.white_to_move:
-                        if turn > 1:
-                            turn -= 1
                     game_state.undoMove()
                     move_made = True
                     animate = False
-                    game_over = False
-                    last_move_printed = False
+                    game_saved = False
                 if e.key == p.K_r:  # reset the board when "r" is pressed
                     game_state = ChessEngine.GameState()
-                    valid_moves = game_state.getValidMoves()
                     square_selected = ()
                     player_clicks = []
-                    move_made = False
+                    move_made = True
                     animate = False
-                    game_over = False
-                    turn = 1
-                    last_move_printed = False
-                    moves_list = []
-                    
-        if move_made:
+                    game_saved = False
+
+        if move_made: # the position changed, whatever the engine was working on is out of date
+            engine.cancel()
+            # the game's status is only known again once the engine answers for the new position
+            game_state.checkmate = game_state.stalemate = game_state.draw = False
+            game_state.draw_reason = None
+            game_over = False
+            thinking = None
+            valid_moves = ChessEngine.MoveList()
+            engine.request("moves", game_state)
+            renderer.stopAnimation()
             if animate:
-                animateMove(game_state.move_log[-1], screen, game_state.board, clock)
-            valid_moves = game_state.getValidMoves()
+                renderer.startAnimation(ChessEngine.Move.fromCode(game_state.move_log[-1]), game_state.board)
             move_made = False
             animate = False
-                                          
-        drawGameState(screen, game_state, valid_moves, square_selected) 
-
-        if game_state.checkmate:
-            game_over = True
-            if game_state.white_to_move:
-                drawText(screen, "Black wins by checkmate")
-                if not last_move_printed:
-                    moves_list[-1] += "+"
-                    moves_list.append("result: 0-1")
-                    print("+")
-                    print("result: 0-1")
-                    last_move_printed = True
-                    saveGame(moves_list)
-            else:
-                drawText(screen, "White wins by checkmate")
-                if not last_move_printed:
-                    moves_list.append(f"\n{turn}. {game_state.move_log[-1].getChessNotation()}++")
-                    moves_list.append("result: 1-0")
-                    print(f"\n{turn}. {game_state.move_log[-1].getChessNotation()}++")
-                    print("result: 1-0")
-                    last_move_printed = True
-                    saveGame(moves_list)
-
-        elif game_state.stalemate:
-            game_over = True
-            drawText(screen, "Stalemate")
-            if not last_move_printed:
-                if not game_state.white_to_move():
-                    moves_list.append(f"\n{turn}. {game_state.move_log[-1].getChessNotation()}")
-                    moves_list.append("result: 1/2-1/2")
-                    print(f"\n{turn}. {game_state.move_log[-1].getChessNotation()}")
-                    print("result: 1/2-1/2")
-                    last_move_printed = True      
-                    saveGame(moves_list)
 
+        for kind, result in engine.responses():
+            if kind == "moves":
+                codes, game_state.checkmate, game_state.stalemate, game_state.draw_reason = result
+                game_state.draw = game_state.draw_reason is not None
+                valid_moves = ChessEngine.MoveList(codes)
+                game_over = game_state.checkmate or game_state.stalemate or game_state.draw
+                if game_over and not game_saved:
+                    saveGame(game_state, gameResult(game_state), player_one, player_two)
+                    game_saved = True
+                human_turn = (game_state.white_to_move and player_one) or (not game_state.white_to_move and player_two)
+                if not human_turn and len(codes) > 0 and not game_state.draw:
+                    engine.request("search", game_state)
+            elif kind == "info":
+                thinking = result
+            elif kind == "search":
+                thinking = None
+                if result is not None:
+                    game_state.makeMove(result)
+                    move_made = True
+                    animate = True
+
+        text = None
+        if game_over:
+            if game_state.checkmate:
+                text = "Black wins by checkmate" if game_state.white_to_move else "White wins by checkmate"
+            else:
+                text = "Stalemate" if game_state.stalemate else "Draw by " + game_state.draw_reason
+
+        if thinking is not None:
+            status = "Thinking... depth %d, %d nps" % (thinking.depth, thinking.nps)
+        elif engine.busy():
+            status = "Thinking..."
+        else:
+            status = ("White" if game_state.white_to_move else "Black") + " to move"
+        drew = renderer.draw(game_state, valid_moves, square_selected, text, status)
+        idle = not drew and not engine.busy() and not move_made
         clock.tick(MAX_FPS)
-        p.display.flip()
 
 
 """
-Highlight square selected and moves for piece selected.
+Engine work off the UI thread: legal moves and computer moves are computed by a daemon thread.
+request() queues a job for the current position (sent as its move list, so the worker's copy keeps the game history
+for repetition draws) and responses() returns the answers that arrived since the last call.
+cancel() stops a running search and drops the answers to every job sent so far, used when the position changes.
 """
 
 
-def highlightSquares(screen, game_state, valid_moves, square_selected):
-    if (len(game_state.move_log)) > 0:
-        last_move = game_state.move_log[-1]
-        surface = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
-        surface.set_alpha(100)
-        surface.fill(p.Color("green"))
-        screen.blit(surface, (last_move.end_col*SQUARE_SIZE, last_move.end_row*SQUARE_SIZE))
+class EngineWorker():
+    def __init__(self, time_limit=AI_TIME_LIMIT):
+        self.time_limit = time_limit
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.searcher = ChessAI.Searcher()
+        self.game_state = ChessEngine.GameState(move_cache=ChessEngine.MoveCache(MOVE_CACHE_SIZE))
+        self.start = self.game_state.snapshot()
+        self.last_job = 0
+        self.first_valid_job = 1 # answers to older jobs were cancelled
+        self.pending = 0 # jobs whose final answer hasn't been read yet
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def request(self, kind, game_state):
+        self.last_job += 1
+        self.pending += 1
+        self.jobs.put((self.last_job, kind, list(game_state.move_log)))
+
+
+    def cancel(self):
+        self.first_valid_job = self.last_job + 1
+        self.searcher.stop()
+
+
+    def busy(self):
+        return self.pending > 0
+
+
+    """
+    Answers that arrived since the last call, as (kind, result) pairs: ("moves", (codes, checkmate, stalemate, draw_reason)),
+    ("info", SearchInfo) while searching and ("search", move code or None) at the end of a search.
+    """
+
+
+    def responses(self):
+        answers = []
+        while True:
+            try:
+                job, kind, result = self.results.get_nowait()
+            except queue.Empty:
+                return answers
+            if kind != "info":
+                self.pending -= 1
+            if job >= self.first_valid_job and kind != "cancelled":
+                answers.append((kind, result))
+
+
+    def run(self):
+        game_state = self.game_state
+        while True:
+            job, kind, codes = self.jobs.get()
+            if job < self.first_valid_job:
+                self.results.put((job, "cancelled", None))
+                continue
+            game_state.restore(self.start)
+            for code in codes:
+                game_state.makeMove(code)
+            if kind == "moves":
+                moves = game_state.getValidMoveCodes()
+                self.results.put((job, kind, (moves, game_state.checkmate, game_state.stalemate, game_state.draw_reason)))
+            else:
+                self.searcher.stop_requested = False # a cancel of an earlier job must not stop this one
+                if job < self.first_valid_job: # cancelled while the position was being set up
+                    self.results.put((job, "cancelled", None))
+                    continue
+                info = self.searcher.search(game_state, time_limit=self.time_limit,
+                                            callback=lambda info: self.results.put((job, "info", info)))
+                self.results.put((job, kind, info.best_move.move_code if info.best_move is not None else None))
 
-    if square_selected != ():
-        row, col = square_selected
-        if game_state.board[row][col][0] == ("w" if game_state.white_to_move else "b"): # square_selected is a piece that can be moved
-            # highlight selected squares
-            surface = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
-            surface.set_alpha(100)  # transparency value -> 0 transparent; 255 opaque
-            surface.fill(p.Color("blue"))
-            screen.blit(surface, (col*SQUARE_SIZE, row*SQUARE_SIZE))
-            
-            # highlight moves from that square
-            surface.fill(p.Color("yellow"))
-            for move in valid_moves:
-                if move.start_row == row and move.start_col == col:
-                    screen.blit(surface, (SQUARE_SIZE*move.end_col, SQUARE_SIZE*move.end_row))
+
+def squareRect(row, col):
+    return p.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
 
 
 """
 Responsible for all the graphics within current game state.
+The empty board is rendered once, overlays, fonts and texts are created once and cached.
+Every frame only the squares whose piece or highlights changed since they were last drawn are redrawn
+and only their rectangles are sent to the display, so a frame where nothing changed costs nothing.
 """
-    
 
-def drawGameState(screen, game_state, valid_moves, square_selected):
-    drawBoard(screen) # draw squares on the board
-    highlightSquares(screen, game_state, valid_moves, square_selected)
-    drawPieces(screen, game_state.board) # draw pieces on top of those squares
+
+class BoardRenderer():
+    def __init__(self, screen):
+        self.screen = screen
+        self.board_surface = p.Surface((WIDTH, HEIGHT))
+        for row in range(DIMENSION):
+            for col in range(DIMENSION):
+                self.board_surface.fill(BOARD_COLORS[(row + col) % 2], squareRect(row, col))
+        self.overlays = {} # color name -> translucent square
+        self.fonts = {}
+        self.texts = {} # text -> rendered surface
+        self.drawn = [None] * 64 # (piece, highlight colors) last drawn on each square, None when it must be redrawn
+        self.text = None # text shown over the board
+        self.status = None # text shown in the status bar
+        self.animation = None # generator drawing one frame of a move animation per call
+
+
+    def overlay(self, color):
+        surface = self.overlays.get(color)
+        if surface is None:
+            surface = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
+            surface.set_alpha(HIGHLIGHT_ALPHA)
+            surface.fill(p.Color(color))
+            self.overlays[color] = surface
+        return surface
+
+
+    def font(self, size, bold=True):
+        font = self.fonts.get((size, bold))
+        if font is None:
+            font = p.font.SysFont("Helvetica", size, bold, False)
+            self.fonts[(size, bold)] = font
+        return font
+
+
+    """
+    Text with a shadow, rendered once per distinct text.
+    """
+
+
+    def textSurface(self, text):
+        surface = self.texts.get(text)
+        if surface is None:
+            font = self.font(32)
+            shadow = font.render(text, 0, p.Color("grey"))
+            surface = p.Surface((shadow.get_width() + 2, shadow.get_height() + 2), p.SRCALPHA)
+            surface.blit(shadow, (0, 0))
+            surface.blit(font.render(text, 0, p.Color("black")), (2, 2))
+            self.texts[text] = surface
+        return surface
+
+
+    def textRect(self, text):
+        return self.textSurface(text).get_rect(center=(WIDTH // 2, HEIGHT // 2))
+
+
+    """
+    Force the squares touching rect (the whole board by default) to be redrawn next frame.
+    """
+
+
+    def invalidate(self, rect=None):
+        if rect is None:
+            self.drawn = [None] * 64
+            return
+        for row in range(max(0, rect.top // SQUARE_SIZE), min(DIMENSION, (rect.bottom - 1) // SQUARE_SIZE + 1)):
+            for col in range(max(0, rect.left // SQUARE_SIZE), min(DIMENSION, (rect.right - 1) // SQUARE_SIZE + 1)):
+                self.drawn[row * 8 + col] = None
+
+
+    """
+    Highlight colors of each square: the last move's end square, the selected square and the moves from it.
+    """
+
+
+    def highlights(self, game_state, valid_moves, square_selected):
+        marks = {}
+        if len(game_state.move_log) > 0:
+            last_move = ChessEngine.Move.fromCode(game_state.move_log[-1])
+            marks[last_move.end_row * 8 + last_move.end_col] = ("green",)
+        if square_selected != ():
+            row, col = square_selected
+            if game_state.board[row][col][0] == ("w" if game_state.white_to_move else "b"): # square_selected is a piece that can be moved
+                marks[row * 8 + col] = marks.get(row * 8 + col, ()) + ("blue",)
+                for move in valid_moves.fromSquare(row, col):
+                    square = move.end_row * 8 + move.end_col
+                    marks[square] = marks.get(square, ()) + ("yellow",)
+        return marks
+
+
+    """
+    Bring the screen up to date, returns False when nothing had to be drawn.
+    While a move is being animated each call draws the next frame of the animation instead.
+    """
+
+
+    def draw(self, game_state, valid_moves, square_selected, text=None, status=None):
+        rects = []
+        if status != self.status:
+            self.status = status
+            rect = p.Rect(0, HEIGHT, WIDTH, STATUS_HEIGHT)
+            self.screen.fill(p.Color("white"), rect)
+            if status is not None:
+                rendered = self.font(16, False).render(status, True, p.Color("black"))
+                self.screen.blit(rendered, rendered.get_rect(midleft=(8, HEIGHT + STATUS_HEIGHT // 2)))
+            rects.append(rect)
+        if self.animation is not None:
+            rect = next(self.animation, None)
+            if rect is not None:
+                p.display.update(rects + [rect])
+                return True
+            self.stopAnimation()
+        marks = self.highlights(game_state, valid_moves, square_selected)
+        text_changed = text != self.text
+        if text_changed:
+            if self.text is not None:
+                self.invalidate(self.textRect(self.text))
+            self.text = text
+        board = game_state.board
+        for square in range(64):
+            row, col = square >> 3, square & 7
+            state = (board[row][col], marks.get(square, ()))
+            if state != self.drawn[square]:
+                rect = squareRect(row, col)
+                self.screen.blit(self.board_surface, rect, rect)
+                for color in state[1]:
+                    self.screen.blit(self.overlay(color), rect)
+                if state[0] != "--":
+                    self.screen.blit(IMAGES[state[0]], rect)
+                self.drawn[square] = state
+                rects.append(rect)
+        if text is not None and (rects or text_changed): # redrawn squares may have painted over the text
+            rect = self.textRect(text)
+            self.screen.blit(self.textSurface(text), rect)
+            rects.append(rect)
+        if rects:
+            p.display.update(rects)
+        return len(rects) > 0
+
+
+    """
+    Animating a move, one frame per draw call so events keep being handled.
+    The board without the moving piece is composed once, each frame only restores the area the piece
+    covered last frame and draws it at its new place.
+    """
+
+
+    def startAnimation(self, move, board):
+        self.animation = self.animationFrames(move, board)
+        self.animated_area = squareRect(move.start_row, move.start_col).union(squareRect(move.end_row, move.end_col))
+
+
+    def stopAnimation(self):
+        if self.animation is not None:
+            self.animation = None
+            self.invalidate(self.animated_area)
+
+
+    def animationFrames(self, move, board):
+        scene = self.board_surface.copy()
+        for row in range(DIMENSION):
+            for col in range(DIMENSION):
+                piece = board[row][col]
+                if piece != "--" and (row, col) != (move.end_row, move.end_col):
+                    scene.blit(IMAGES[piece], squareRect(row, col))
+        if move.piece_captured != "--": # the captured piece stays visible until the moving piece lands
+            scene.blit(IMAGES[move.piece_captured], squareRect(move.end_row, move.end_col))
+        
+        d_row = move.end_row - move.start_row
+        d_col = move.end_col - move.start_col
+        frames_per_square = 10    # frames to move one square
+        frame_count = (abs(d_row) + abs(d_col)) * frames_per_square
+        previous = squareRect(move.start_row, move.start_col)
+        for frame in range(frame_count+1):
+            row, col = (move.start_row + d_row*frame/frame_count, move.start_col + d_col*frame/frame_count)
+            rect = p.Rect(int(col*SQUARE_SIZE), int(row*SQUARE_SIZE), SQUARE_SIZE, SQUARE_SIZE)
+            dirty = rect.union(previous)
+            self.screen.blit(scene, dirty, dirty)
+            self.screen.blit(IMAGES[move.piece_moved], rect)
+            previous = rect
+            yield dirty
 
 
 """
-Draw the squares on the board.
-The top left square is always light.
+Let the player pick the piece a pawn promotes to.
+Draws the four choices across the middle of the board and waits for a click on one of them.
 """
 
 
-def drawBoard(screen):
-    global colors
-    colors = [p.Color("white"), p.Color("gray")]
-    for row in range(DIMENSION):
-        for column in range(DIMENSION):
-            color = colors[((row+column) % 2)]
-            p.draw.rect(screen, color, p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    
+def choosePromotion(screen, color):
+    choices = ["Q", "R", "B", "N"]
+    left = (WIDTH - len(choices) * SQUARE_SIZE) // 2
+    top = (HEIGHT - SQUARE_SIZE) // 2
+    for i, piece in enumerate(choices):
+        square = p.Rect(left + i * SQUARE_SIZE, top, SQUARE_SIZE, SQUARE_SIZE)
+        p.draw.rect(screen, p.Color("white"), square)
+        p.draw.rect(screen, p.Color("black"), square, 1)
+        screen.blit(IMAGES[color + piece], square)
+    p.display.update(p.Rect(left, top, len(choices) * SQUARE_SIZE, SQUARE_SIZE))
+    while True:
+        e = p.event.wait()
+        if e.type == p.QUIT:
+            p.quit()
+            sys.exit()
+        elif e.type == p.MOUSEBUTTONDOWN:
+            x, y = p.mouse.get_pos()
+            if top <= y < top + SQUARE_SIZE and left <= x < left + len(choices) * SQUARE_SIZE:
+                return choices[(x - left) // SQUARE_SIZE]
+
 
 """
-Draw the pieces on the board using the current game_state.board
+PGN result of a finished game.
 """
 
 
-def drawPieces(screen, board):
-    for row in range(DIMENSION):
-        for column in range(DIMENSION):
-            piece = board[row][column]
-            if piece != "--":
-                screen.blit(IMAGES[piece], p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+def gameResult(game_state):
+    if game_state.checkmate:
+        return "0-1" if game_state.white_to_move else "1-0"
+    return "1/2-1/2"
 
 
 """
-Animating a move.
+Append the finished game to GAMES_FILE as PGN and print it to the console.
 """
-         
-def animateMove(move, screen, board, clock):
-    global colors
-    d_row = move.end_row - move.start_row
-    d_col = move.end_col - move.start_col
-    frames_per_square = 10    # frames to move one square
-    frame_count = (abs(d_row) + abs(d_col)) * frames_per_square
-    for frame in range(frame_count+1):
-        row, col = (move.start_row + d_row*frame/frame_count, move.start_col + d_col*frame/frame_count)
-        drawBoard(screen)
-        drawPieces(screen, board)
-        
-        # erase the piece moved from its ending square
-        color = colors[(move.end_row + move.end_col) % 2]
-        end_square = p.Rect(move.end_col*SQUARE_SIZE, move.end_row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
-        p.draw.rect(screen, color, end_square)
-        
-        # draw captured piece onto rectangle
-        if move.piece_captured != "--":
-            screen.blit(IMAGES[move.piece_captured], end_square)
-        
-        # draw moving pieces
-        screen.blit(IMAGES[move.piece_moved], p.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-        p.display.flip()
-        clock.tick(60)
-
-
-def saveGame(moves_list):
-    result = moves_list.pop()
-    turns_dict = {}
-    for i in range(len(moves_list)-1,-1,-1):
-        try:
-            if int(moves_list[i][1]) not in turns_dict:
-                turns_dict[moves_list[i][1]] = moves_list[i][1:]+"\n"
-        except:
-            pass
-    file = open("Chess/last_game_logs.txt","w")
-    for turn in sorted(turns_dict.keys()):
-        file.write(turns_dict[turn])
-    file.write(result)
-    file.close()
-
-
-def drawText(screen, text):
-    font = p.font.SysFont("Helvetica", 32, True, False)
-    text_object = font.render(text, 0, p.Color("grey"))
-    text_location = p.Rect(0, 0, WIDTH, HEIGHT).move(WIDTH/2-text_object.get_width()/2, HEIGHT/2-text_object.get_height()/2)
-    screen.blit(text_object, text_location)
-    text_object = font.render(text, 0, p.Color("black"))
-    screen.blit(text_object, text_location.move(2, 2))
+
+
+def saveGame(game_state, result, player_one, player_two):
+    tags = {"Event": "Casual game", "Site": "ChessMain", "Date": time.strftime("%Y.%m.%d"),
+            "White": "Human" if player_one else "Computer", "Black": "Human" if player_two else "Computer"}
+    fen, moves = ChessPgn.gameSan(game_state)
+    with ChessPgn.PgnWriter(GAMES_FILE) as writer:
+        writer.writeGame(moves, tags, result, fen)
+    print(ChessPgn.formatGame(moves, tags, result, fen), end="")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+"""
+Multi-process drivers for perft and batch game replay, so the pure Python engine can use every core.
+Work is split at the root: perft into the subtrees below the first one or two plies, replay into chunks of game lines.
+Workers are sent compact tasks (FEN string plus packed move ints, or raw game lines) and build their own GameState,
+nothing with bound methods is pickled. Results are merged in a fixed order so the output doesn't depend on scheduling,
+and every task reports the worker process it ran on so throughput can be shown per worker.
+
+Usage (from the repository root):
+    python Chess/ChessParallel.py perft --position kiwipete --depth 4 --jobs 8
+    python Chess/ChessParallel.py perft --fen "<fen>" --depth 5 --divide
+    python Chess/ChessParallel.py replay games.txt --jobs 8 --quiet
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import ChessPerft
+import ChessReplay
+
+
+"""
+Worker side of parallel perft: play the moves of the task from the FEN and count the subtree below them.
+"""
+
+
+def perftTask(task):
+    backend, fen, codes, depth = task
+    start = time.perf_counter()
+    game_state = ChessPerft.BACKENDS[backend]()
+    game_state.loadFen(fen)
+    for code in codes:
+        game_state.makeMove(code)
+    nodes = ChessPerft.perft(game_state, depth)
+    return codes, nodes, os.getpid(), time.perf_counter() - start
+
+
+"""
+Split a perft of depth plies into tasks of (backend, fen, move codes from the root, remaining depth).
+A second ply is split too when the root alone gives too few tasks to keep jobs workers busy.
+Raises ValueError for a depth below 1, there is nothing to split.
+"""
+
+
+def splitPerft(backend, fen, depth, jobs):
+    if depth < 1:
+        raise ValueError("perft depth must be at least 1")
+    game_state = ChessPerft.BACKENDS[backend]()
+    game_state.loadFen(fen)
+    root_moves = game_state.getValidMoveCodes()
+    if depth <= 2 or len(root_moves) >= jobs * 4:
+        return [(backend, fen, [code], depth - 1) for code in root_moves]
+    tasks = []
+    for code in root_moves:
+        game_state.makeMove(code)
+        replies = game_state.getValidMoveCodes()
+        if len(replies) == 0: # mate or stalemate after the root move, its task counts 0 nodes but keeps it in divide
+            tasks.append((backend, fen, [code], depth - 1))
+        for reply in replies:
+            tasks.append((backend, fen, [code, reply], depth - 2))
+        game_state.undoMove()
+    return tasks
+
+
+"""
+Per worker totals from (pid, items, seconds) tuples, sorted by pid.
+Returns a list of dicts with the worker's tasks, items (nodes or games), busy seconds and items per second.
+"""
+
+
+def workerStats(samples):
+    workers = {}
+    for pid, items, seconds in samples:
+        worker = workers.setdefault(pid, {"pid": pid, "tasks": 0, "items": 0, "seconds": 0.0})
+        worker["tasks"] += 1
+        worker["items"] += items
+        worker["seconds"] += seconds
+    for worker in workers.values():
+        worker["rate"] = worker["items"] / worker["seconds"] if worker["seconds"] > 0 else 0.0
+    return [workers[pid] for pid in sorted(workers)]
+
+
+"""
+Perft of fen to depth on jobs processes.
+Returns (nodes, divide dict {root move in coordinate notation: nodes}, per worker stats, wall clock seconds).
+"""
+
+
+def parallelPerft(fen, depth, jobs, backend="bitboard"):
+    start = time.perf_counter()
+    tasks = splitPerft(backend, fen, depth, jobs)
+    game_state = ChessPerft.BACKENDS[backend]()
+    game_state.loadFen(fen)
+    names = {move.move_code: move.getUciNotation() for move in game_state.getValidMoves()}
+    divide = {name: 0 for name in names.values()}
+    samples = []
+    with multiprocessing.Pool(jobs) as pool:
+        for codes, nodes, pid, seconds in pool.imap_unordered(perftTask, tasks, chunksize=1):
+            divide[names[codes[0]]] += nodes
+            samples.append((pid, nodes, seconds))
+    divide = {name: divide[name] for name in sorted(divide)}
+    return sum(divide.values()), divide, workerStats(samples), time.perf_counter() - start
+
+
+"""
+Worker side of parallel replay: replay a chunk of game lines, line numbers are relative to the chunk.
+"""
+
+
+def replayTask(task):
+    first_line, lines, move_format = task
+    start = time.perf_counter()
+    replays = list(ChessReplay.replayGames(lines, move_format))
+    for replay in replays:
+        replay["line"] += first_line - 1
+    return replays, os.getpid(), time.perf_counter() - start
+
+
+def readChunks(source, chunk_size, move_format):
+    lines = []
+    first_line = 1
+    for line_number, line in enumerate(source, 1):
+        lines.append(line)
+        if len(lines) == chunk_size:
+            yield (first_line, lines, move_format)
+            lines = []
+            first_line = line_number + 1
+    if lines:
+        yield (first_line, lines, move_format)
+
+
+"""
+Replay the games of source (an iterable of lines) on jobs processes, yields result dicts in input order.
+At most jobs * 2 chunks are in flight so memory stays bounded however long the input is.
+samples collects (pid, games, seconds) for every chunk.
+"""
+
+
+def parallelReplay(source, jobs, move_format="auto", chunk_size=1000, samples=None):
+    game = 0
+    with multiprocessing.Pool(jobs) as pool:
+        pending = []
+        for task in readChunks(source, chunk_size, move_format):
+            pending.append(pool.apply_async(replayTask, (task,)))
+            if len(pending) < jobs * 2:
+                continue
+            replays, pid, seconds = pending.pop(0).get()
+            if samples is not None:
+                samples.append((pid, len(replays), seconds))
+            for replay in replays:
+                game += 1
+                replay["game"] = game
+                yield replay
+        for result in pending:
+            replays, pid, seconds = result.get()
+            if samples is not None:
+                samples.append((pid, len(replays), seconds))
+            for replay in replays:
+                game += 1
+                replay["game"] = game
+                yield replay
+
+
+def printWorkers(workers, unit):
+    for worker in workers:
+        print("  worker %-7d %5d tasks %12d %s in %8.3fs (%.0f %s/sec)" % (
+            worker["pid"], worker["tasks"], worker["items"], unit, worker["seconds"], worker["rate"], unit), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run perft or batch game replay on several processes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    perft_parser = commands.add_parser("perft", help="parallel perft of suite positions or a FEN")
+    perft_parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: number of cores)")
+    perft_parser.add_argument("--depth", type=int, default=4)
+    perft_parser.add_argument("--backend", choices=sorted(ChessPerft.BACKENDS), default="bitboard")
+    perft_parser.add_argument("--position", action="append", help="run only the named position(s) from the suite")
+    perft_parser.add_argument("--fen", help="run a custom position instead of the suite")
+    perft_parser.add_argument("--divide", action="store_true", help="print the node count per root move")
+
+    replay_parser = commands.add_parser("replay", help="parallel version of ChessReplay")
+    replay_parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: number of cores)")
+    replay_parser.add_argument("input", help="file with one game per line, - for stdin")
+    replay_parser.add_argument("--format", choices=["auto", "uci", "notation"], default="auto")
+    replay_parser.add_argument("--chunk-size", type=int, default=1000, help="games per task")
+    replay_parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+    jobs = max(1, args.jobs)
+
+    if args.command == "perft":
+        if args.depth < 1:
+            perft_parser.error("--depth must be at least 1")
+        if args.fen:
+            positions = [("custom", args.fen, [])]
+        else:
+            positions = [position for position in ChessPerft.POSITIONS if not args.position or position[0] in args.position]
+            if not positions:
+                perft_parser.error("unknown position, choose from: " + ", ".join(position[0] for position in ChessPerft.POSITIONS))
+        failures = 0
+        for name, fen, counts in positions:
+            depth = args.depth if args.fen else min(args.depth, len(counts))
+            nodes, divide, workers, seconds = parallelPerft(fen, depth, jobs, args.backend)
+            expected = counts[depth - 1] if depth <= len(counts) else None
+            status = "??" if expected is None else "ok" if nodes == expected else "FAIL"
+            failures += status == "FAIL"
+            print("%-9s %-20s depth %d  nodes %10d  %-4s  %8.3fs  %10.0f nps  (%d jobs)" % (
+                args.backend, name, depth, nodes, status, seconds, nodes / seconds if seconds > 0 else 0.0, jobs))
+            if args.divide:
+                for move, move_nodes in divide.items():
+                    print("  %s: %d" % (move, move_nodes))
+            printWorkers(workers, "nodes")
+        return 1 if failures else 0
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", errors="replace")
+    samples = []
+    games = 0
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for replay in parallelReplay(source, jobs, args.format, args.chunk_size, samples):
+            games += 1
+            failed += not replay["ok"]
+            if not args.quiet:
+                sys.stdout.write(json.dumps(replay) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    seconds = time.perf_counter() - start
+    print("%d games (%d ok, %d failed) in %.3fs (%.1f games/sec, %d jobs)" % (
+        games, games - failed, failed, seconds, games / seconds if seconds > 0 else 0.0, jobs), file=sys.stderr)
+    printWorkers(workerStats(samples), "games")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Perft (performance test) for the move generator.
+perft counts the leaf nodes of the legal move tree down to a given depth, divide splits that count by root move.
+Comparing the counts against known values for a set of standard positions catches move generation bugs,
+and the timings give a nodes/sec figure to compare engine changes against earlier runs.
+
+Usage (from the repository root):
+    python Chess/ChessPerft.py --depth 3
+    python Chess/ChessPerft.py --backend bitboard --position kiwipete --depth 3 --save run.json
+    python Chess/ChessPerft.py --compare run.json
+    python Chess/ChessPerft.py --fen "<fen>" --depth 2 --divide
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import ChessEngine
+import ChessBitboard
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+BACKENDS = {
+    "string": ChessEngine.GameState,
+    "bitboard": ChessBitboard.BitboardGameState,
+}
+
+# (name, FEN, known node counts for depth 1, 2, 3, ...)
+POSITIONS = [
+    ("startpos", START_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624, 11030083]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    # en passant edge cases
+    ("enpassant-pin-black", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", [18, 92, 1670, 10138, 185429, 1134888]),
+    ("enpassant-pin-white", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", [13, 102, 1266, 10276, 135655, 1015133]),
+    ("enpassant-check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", [15, 126, 1928, 13931, 206379, 1440467]),
+    ("enpassant-diagonal-pin", "8/2K5/8/3pP3/5b2/8/8/7k w - d6 0 1", [9, 108, 784, 9914, 69409]),
+    # castling edge cases
+    ("castle-short-check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1", [15, 66, 1198, 6399, 120330, 661072]),
+    ("castle-long-check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", [16, 71, 1286, 7418, 141077, 803711]),
+    ("castle-rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", [26, 1141, 27826, 1274206]),
+    ("castle-prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", [44, 1494, 50509, 1720476]),
+    # promotion edge cases
+    ("promote-out-of-check", "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", [11, 133, 1442, 19174, 266199, 3821001]),
+    ("promote-check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", [9, 40, 472, 2661, 38983, 217342]),
+    ("underpromote", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", [6, 27, 273, 1329, 18135, 92683]),
+    ("self-stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", [2, 6, 13, 63, 382, 2217]),
+    ("stalemate-checkmate", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", [10, 25, 268, 926, 10857, 43261, 567584]),
+    # checks
+    ("discovered-check", "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", [29, 165, 5160, 31961, 1004658]),
+    ("double-check", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", [37, 183, 6559, 23527]),
+]
+
+
+"""
+Count the leaf nodes of the legal move tree depth plies deep.
+"""
+
+
+def perft(game_state, depth):
+    if depth == 0:
+        return 1
+    moves = game_state.getValidMoveCodes()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game_state.makeMove(move)
+        nodes += perft(game_state, depth - 1)
+        game_state.undoMove()
+    return nodes
+
+
+"""
+Perft split by root move, returns a dict {coordinate notation (e.g. "e2e4", "a7a8q"): nodes}.
+"""
+
+
+def divide(game_state, depth):
+    results = {}
+    for move in game_state.getValidMoves():
+        game_state.makeMove(move)
+        nodes = perft(game_state, depth - 1)
+        game_state.undoMove()
+        results[move.getUciNotation()] = nodes
+    return results
+
+
+"""
+Run perft for every depth from 1 to max_depth on one position.
+Returns a list of result dicts, expected is None when the count is not known.
+"""
+
+
+def runPosition(backend, name, fen, counts, max_depth, move_cache_size=0):
+    results = []
+    for depth in range(1, max_depth + 1):
+        game_state = BACKENDS[backend](move_cache=ChessEngine.MoveCache(move_cache_size) if move_cache_size else None)
+        game_state.loadFen(fen)
+        start = time.perf_counter()
+        nodes = perft(game_state, depth)
+        seconds = time.perf_counter() - start
+        expected = counts[depth - 1] if depth <= len(counts) else None
+        results.append({
+            "backend": backend,
+            "position": name,
+            "depth": depth,
+            "nodes": nodes,
+            "expected": expected,
+            "ok": expected is None or nodes == expected,
+            "seconds": seconds,
+            "nps": nodes / seconds if seconds > 0 else 0.0,
+        })
+    return results
+
+
+def printResult(result, previous=None):
+    status = "ok" if result["expected"] is not None and result["ok"] else "??" if result["expected"] is None else "FAIL"
+    line = "%-9s %-20s depth %d  nodes %10d  %-4s  %8.3fs  %10.0f nps" % (
+        result["backend"], result["position"], result["depth"], result["nodes"], status, result["seconds"], result["nps"])
+    if not result["ok"]:
+        line += "  (expected %d)" % result["expected"]
+    if previous is not None and previous["nps"] > 0:
+        line += "  %+.1f%% vs previous" % ((result["nps"] / previous["nps"] - 1) * 100)
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft benchmark and correctness suite for the chess engine.")
+    parser.add_argument("--depth", type=int, default=3, help="maximum depth (positions stop at their deepest known count unless --fen is used)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS) + ["all"], default="string")
+    parser.add_argument("--position", action="append", help="run only the named position(s) from the suite")
+    parser.add_argument("--fen", help="run a custom position instead of the suite")
+    parser.add_argument("--divide", action="store_true", help="print the node count per root move at --depth")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare nodes/sec against results saved by an earlier --save")
+    parser.add_argument("--move-cache", type=int, default=0, help="legal move cache capacity (default: no cache)")
+    args = parser.parse_args(argv)
+
+    backends = sorted(BACKENDS) if args.backend == "all" else [args.backend]
+
+    if args.fen:
+        positions = [("custom", args.fen, [])]
+    else:
+        positions = [position for position in POSITIONS if not args.position or position[0] in args.position]
+        if not positions:
+            parser.error("unknown position, choose from: " + ", ".join(position[0] for position in POSITIONS))
+
+    if args.divide:
+        for backend in backends:
+            for name, fen, counts in positions:
+                game_state = BACKENDS[backend]()
+                game_state.loadFen(fen)
+                results = divide(game_state, args.depth)
+                print("%s %s depth %d" % (backend, name, args.depth))
+                for move in sorted(results):
+                    print("  %s: %d" % (move, results[move]))
+                print("  total: %d" % sum(results.values()))
+        return 0
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as file:
+            for result in json.load(file):
+                previous[(result["backend"], result["position"], result["depth"])] = result
+
+    all_results = []
+    total_nodes = 0
+    total_seconds = 0.0
+    for backend in backends:
+        for name, fen, counts in positions:
+            max_depth = args.depth if args.fen else min(args.depth, len(counts))
+            for result in runPosition(backend, name, fen, counts, max_depth, args.move_cache):
+                printResult(result, previous.get((backend, name, result["depth"])))
+                all_results.append(result)
+                total_nodes += result["nodes"]
+                total_seconds += result["seconds"]
+
+    failures = [result for result in all_results if not result["ok"]]
+    print("total: %d nodes in %.3fs (%.0f nps), %d failure(s)" % (
+        total_nodes, total_seconds, total_nodes / total_seconds if total_seconds > 0 else 0.0, len(failures)))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(all_results, file, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
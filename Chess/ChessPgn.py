@@ -0,0 +1,345 @@
+"""
+Standard algebraic notation (SAN) and PGN files.
+getSan / parseSan convert between packed move ints and SAN using the legal moves of a GameState (either backend),
+so disambiguation ("Nbd7", "R1e2", "Qh4xe1") always matches the position.
+readGames streams games out of a PGN file of any size, only the game being read is kept in memory.
+PgnWriter appends games to a file, so an archive keeps growing instead of being overwritten.
+
+Usage (from the repository root):
+    python Chess/ChessPgn.py games.pgn
+    python Chess/ChessPgn.py --replay --quiet games.pgn
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+import ChessEngine
+from ChessEngine import CODE_PIECES, PROMOTION_PIECES, MOVE_CASTLE, MOVE_ENPASSANT
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+FILES = "abcdefgh"
+RANKS = "87654321" # indexed by board row
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+SEVEN_TAG_ROSTER = (("Event", "?"), ("Site", "?"), ("Date", "????.??.??"), ("Round", "?"), ("White", "?"), ("Black", "?"),
+                    ("Result", "*"))
+LINE_WIDTH = 79
+
+# a "P" for pawn moves is tolerated, older ChessMain logs wrote "Pe4"
+SAN_PATTERN = re.compile(r"^([PNBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBNqrbn]))?$")
+TAG_PATTERN = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# comments (an unclosed "{" runs to the end of the line), variations, rest of line comments, NAGs and everything else
+TOKEN_PATTERN = re.compile(r"\{[^}]*\}?|[()]|;.*|\$\d+|[^\s(){};]+")
+
+
+"""
+SAN of a legal move without the check suffix. valid_codes are the legal moves of the position, used to disambiguate.
+"""
+
+
+def sanText(code, valid_codes):
+    if code & MOVE_CASTLE:
+        return "O-O" if (code >> 6) & 7 == 6 else "O-O-O"
+    start_row, start_col, end = (code >> 3) & 7, code & 7, (code >> 6) & 63
+    target = FILES[end & 7] + RANKS[end >> 3]
+    capture = (code >> 21) & 15 or code & MOVE_ENPASSANT
+    piece = CODE_PIECES[(code >> 17) & 15][1]
+    if piece == "P":
+        san = (FILES[start_col] + "x" if capture else "") + target
+        if (code >> 14) & 7:
+            san += "=" + PROMOTION_PIECES[(code >> 14) & 7]
+        return san
+    prefix = ""
+    moved = (code >> 17) & 15
+    others = [other for other in valid_codes if (other >> 6) & 63 == end and (other >> 17) & 15 == moved and other & 63 != code & 63]
+    if others:
+        if all(other & 7 != start_col for other in others):
+            prefix = FILES[start_col]
+        elif all((other >> 3) & 7 != start_row for other in others):
+            prefix = RANKS[start_row]
+        else:
+            prefix = FILES[start_col] + RANKS[start_row]
+    return piece + prefix + ("x" if capture else "") + target
+
+
+"""
+SAN of a legal move of the game state, with "+" or "#" when it gives check or mate.
+The move is made and taken back to find the suffix, the game state's status flags are left as they were.
+"""
+
+
+def getSan(game_state, code, valid_codes=None):
+    if isinstance(code, ChessEngine.Move):
+        code = code.move_code
+    if valid_codes is None:
+        valid_codes = game_state.getValidMoveCodes()
+    flags = (game_state.in_check, game_state.checkmate, game_state.stalemate, game_state.draw, game_state.draw_reason)
+    game_state.makeMove(code)
+    replies = game_state.getValidMoveCodes()
+    suffix = "+" if game_state.in_check and replies else "#" if game_state.in_check else ""
+    game_state.undoMove()
+    game_state.in_check, game_state.checkmate, game_state.stalemate, game_state.draw, game_state.draw_reason = flags
+    return sanText(code, valid_codes) + suffix
+
+
+"""
+Packed move int of the legal move written as text in SAN (check marks, annotations and "0-0" castling are accepted).
+Raises ValueError for illegal, ambiguous or unreadable moves.
+"""
+
+
+def parseSan(game_state, text, valid_codes=None):
+    if valid_codes is None:
+        valid_codes = game_state.getValidMoveCodes()
+    san = text.rstrip("+#!?")
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        end_col = 6 if len(san) == 3 else 2
+        for code in valid_codes:
+            if code & MOVE_CASTLE and (code >> 6) & 7 == end_col:
+                return code
+        raise ValueError("illegal move")
+    match = SAN_PATTERN.match(san)
+    if match is None:
+        raise ValueError("invalid move")
+    piece, from_file, from_rank, target, promotion = match.groups()
+    color = "w" if game_state.white_to_move else "b"
+    moved = ChessEngine.PIECE_CODES[color + (piece or "P")]
+    end = RANKS.index(target[1]) * 8 + FILES.index(target[0])
+    promotion_index = PROMOTION_PIECES.index(promotion.upper()) if promotion else 0
+    found = [code for code in valid_codes
+             if (code >> 6) & 63 == end and (code >> 17) & 15 == moved and (code >> 14) & 7 == promotion_index
+             and (from_file is None or FILES[code & 7] == from_file) and (from_rank is None or RANKS[(code >> 3) & 7] == from_rank)]
+    if len(found) == 1:
+        return found[0]
+    raise ValueError("ambiguous move" if found else "illegal move")
+
+
+"""
+Play packed moves from the current position and return their SAN, check suffixes included.
+Only one move generation per ply is needed: the legal moves after a move give both its suffix and the next
+move's disambiguation.
+"""
+
+
+def playSan(game_state, codes):
+    sans = []
+    valid_codes = game_state.getValidMoveCodes()
+    for code in codes:
+        san = sanText(code, valid_codes)
+        game_state.makeMove(code)
+        valid_codes = game_state.getValidMoveCodes()
+        if game_state.in_check:
+            san += "+" if valid_codes else "#"
+        sans.append(san)
+    return sans
+
+
+"""
+(start FEN, SAN of every move) of the game played so far in game_state.
+The moves are taken back and replayed, the game state ends up as it was.
+"""
+
+
+def gameSan(game_state):
+    codes = list(game_state.move_log)
+    for _ in codes:
+        game_state.undoMove()
+    fen = game_state.getFen()
+    return fen, playSan(game_state, codes)
+
+
+"""
+Stream the games of a PGN file (any iterable of lines).
+Yields one dict per game: tags (dict), moves (list of SAN strings) and result.
+Comments, variations, NAGs and move numbers are skipped.
+"""
+
+
+def readGames(lines):
+    tags = {}
+    moves = []
+    result = None
+    in_movetext = False
+    in_comment = False
+    depth = 0 # variation nesting
+    for line in lines:
+        if in_comment:
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+        stripped = line.strip().lstrip("\ufeff") # a byte order mark can start the file
+        if not stripped or stripped[0] == "%":
+            continue
+        if stripped[0] == "[" and depth == 0:
+            match = TAG_PATTERN.match(stripped)
+            if match is not None:
+                if in_movetext: # a game without a result token, the next one starts here
+                    yield {"tags": tags, "moves": moves, "result": tags.get("Result", "*")}
+                    tags, moves, in_movetext = {}, [], False
+                tags[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+                continue
+        in_movetext = True
+        for token in TOKEN_PATTERN.findall(line):
+            first = token[0]
+            if first == "{":
+                in_comment = not token.endswith("}")
+            elif first == "(":
+                depth += 1
+            elif first == ")":
+                depth = max(0, depth - 1)
+            elif first == ";" or first == "$" or depth:
+                continue
+            elif token in RESULTS:
+                result = token
+                yield {"tags": tags, "moves": moves, "result": result}
+                tags, moves, result, in_movetext = {}, [], None, False
+            else:
+                if first.isdigit(): # move number, "12." / "12..." or glued to the move as "12.e4"
+                    token = token[token.rfind(".") + 1:] if "." in token else ""
+                if token:
+                    moves.append(token)
+    if in_movetext or tags:
+        yield {"tags": tags, "moves": moves, "result": tags.get("Result", "*")}
+
+
+"""
+Replay a game read by readGames on game_state (from its FEN tag or the start position).
+Returns the list of packed moves, raises ValueError naming the first illegal or unreadable move.
+"""
+
+
+def replayGame(game_state, game):
+    game_state.loadFen(game["tags"].get("FEN", START_FEN))
+    codes = []
+    valid_codes = game_state.getValidMoveCodes()
+    for ply, san in enumerate(game["moves"], 1):
+        try:
+            code = parseSan(game_state, san, valid_codes)
+        except ValueError as error:
+            raise ValueError("%s %s at ply %d" % (error, san, ply))
+        game_state.makeMove(code)
+        codes.append(code)
+        valid_codes = game_state.getValidMoveCodes()
+    return codes
+
+
+"""
+PGN text of one game: the seven tag roster (missing tags get their "unknown" values), any other tags, then the moves.
+"""
+
+
+def formatGame(moves, tags=None, result="*", fen=START_FEN):
+    tags = dict(tags or {})
+    tags["Result"] = result
+    if fen != START_FEN:
+        tags["SetUp"] = "1"
+        tags["FEN"] = fen
+    lines = []
+    for name, default in SEVEN_TAG_ROSTER:
+        lines.append('[%s "%s"]' % (name, str(tags.pop(name, default)).replace("\\", "\\\\").replace('"', '\\"')))
+    for name, value in tags.items():
+        lines.append('[%s "%s"]' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')))
+    lines.append("")
+
+    fields = fen.split()
+    white_to_move = len(fields) < 2 or fields[1] == "w"
+    number = int(fields[5]) if len(fields) > 5 else 1
+    words = []
+    for san in moves:
+        if white_to_move:
+            words.append("%d." % number)
+        elif not words:
+            words.append("%d..." % number)
+        words.append(san)
+        if not white_to_move:
+            number += 1
+        white_to_move = not white_to_move
+    words.append(result)
+
+    line = ""
+    for word in words:
+        if line and len(line) + 1 + len(word) > LINE_WIDTH:
+            lines.append(line)
+            line = word
+        else:
+            line = line + " " + word if line else word
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+
+class PgnWriter():
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+
+
+    def close(self):
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def writeGame(self, moves, tags=None, result="*", fen=START_FEN):
+        self.file.write(formatGame(moves, tags, result, fen))
+        self.file.flush()
+
+
+    """
+    Append the game played so far in game_state.
+    """
+
+
+    def writeGameState(self, game_state, tags=None, result="*"):
+        fen, moves = gameSan(game_state)
+        self.writeGame(moves, tags, result, fen)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a PGN file, optionally replaying every game to check its moves.")
+    parser.add_argument("input", help="PGN file, - for stdin")
+    parser.add_argument("--replay", action="store_true", help="replay the moves through GameState and report illegal ones")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", errors="replace")
+    game_state = ChessEngine.GameState()
+    games = 0
+    plies = 0
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for game in readGames(source):
+            games += 1
+            plies += len(game["moves"])
+            report = {"game": games, "plies": len(game["moves"]), "result": game["result"]}
+            if args.replay:
+                try:
+                    replayGame(game_state, game)
+                    report["ok"] = True
+                except ValueError as error:
+                    failed += 1
+                    report["ok"] = False
+                    report["error"] = str(error)
+            if not args.quiet:
+                sys.stdout.write(json.dumps(report) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    seconds = time.perf_counter() - start
+    print("%d games, %d plies in %.3fs (%.1f games/sec%s)" % (
+        games, plies, seconds, games / seconds if seconds > 0 else 0.0, ", %d failed" % failed if args.replay else ""), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Opt-in instrumentation of the engine's hot paths.
+enable() replaces the instrumented methods of GameState, BitboardGameState, Move, MoveList and MoveCache with wrappers
+that count calls and time them, disable() puts the original methods back. Nothing is checked in the engine itself,
+so while instrumentation is off the engine runs exactly the code it runs without this module.
+Move objects are counted through Move.setCode, which every Move goes through.
+
+snapshot() returns the counters as a dict (inclusive and self seconds per method, plus a few ratios) and
+writeSnapshot() saves it as JSON. Self time is also recorded per stack of instrumented calls in the folded format
+of flamegraph.pl / speedscope ("getValidMoves;generateMoveCodes;getPawnMoves 1234", in microseconds).
+installSignalHandlers() lets a running process be diagnosed from outside: SIGUSR2 switches instrumentation on and off
+and SIGUSR1 writes a snapshot.
+
+Usage (from the repository root):
+    python Chess/ChessProfile.py --workload perft --depth 3 --json stats.json --folded stacks.txt
+    python Chess/ChessProfile.py --workload search --depth 4 --cprofile search.prof
+"""
+
+import argparse
+import cProfile
+import json
+import signal
+import sys
+import threading
+import time
+import weakref
+
+import ChessEngine
+import ChessBitboard
+import ChessAI
+import ChessPerft
+
+
+# (class, method names) that enable() instruments
+TARGETS = [
+    (ChessEngine.GameState, ["getValidMoves", "getValidMoveCodes", "generateMoveCodes", "getAllPossibleMoves",
+                             "getPawnMoves", "getRookMoves", "getKnightMoves", "getBishopMoves", "getQueenMoves",
+                             "getKingMoves", "getCastleMoves", "makeMove", "undoMove", "movePieces", "takeBackPieces",
+                             "checkForPinsAndChecks",
+                             "squareUnderAttack", "squaresUnderAttack", "inCheck", "getDrawReason", "legalityContext",
+                             "generateStageCodes", "isLegalMove", "isPseudoLegal"]),
+    (ChessBitboard.BitboardGameState, ["getValidMoves", "getValidMoveCodes", "generateMoveCodes", "getPawnMoves",
+                                       "getCastleMoves", "makeMove", "undoMove", "movePieces", "takeBackPieces",
+                                       "attackersTo", "pinnedPieces",
+                                       "squareUnderAttack", "inCheck", "getDrawReason", "legalityContext",
+                                       "generateStageCodes", "isLegalMove", "isPseudoLegal"]),
+    (ChessEngine.Move, ["setCode"]),
+    (ChessEngine.MoveList, ["__init__"]),
+    (ChessEngine.MoveCache, ["get"]),
+]
+
+STATS = {} # "GameState.makeMove" -> [calls, inclusive seconds, self seconds]
+FOLDED = {} # "GameState.getValidMoves;GameState.generateMoveCodes" -> self seconds
+_originals = {} # (class, name) -> original function while enabled, None if the class inherited it
+_attached = weakref.WeakSet() # game states whose move_functions were rebound by attach
+_local = threading.local() # per thread stack of [name, seconds spent in instrumented callees]
+_lock = threading.Lock() # guards STATS and FOLDED, instrumented code may run on several threads (ChessServer, ChessUci)
+
+
+def enabled():
+    return len(_originals) > 0
+
+
+def _wrap(name, function):
+    stats = STATS.setdefault(name, [0, 0.0, 0.0])
+
+    def wrapper(*args, **kwargs):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        frame = [name, 0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            own = elapsed - frame[1]
+            key = ";".join([caller[0] for caller in stack] + [name])
+            with _lock:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += own
+                FOLDED[key] = FOLDED.get(key, 0.0) + own
+            if stack:
+                stack[-1][1] += elapsed
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+"""
+Switch instrumentation on. GameStates keep their per-piece generators in a dict of bound methods built by __init__,
+so generators are only counted for game states created afterwards or passed to attach().
+"""
+
+
+def enable():
+    if enabled():
+        return
+    for cls, names in TARGETS:
+        for name in names:
+            # methods inherited from BaseGameState are wrapped on each backend so they are counted per backend
+            _originals[(cls, name)] = vars(cls).get(name)
+            setattr(cls, name, _wrap(cls.__name__ + "." + name, getattr(cls, name)))
+    for game_state in list(_attached):
+        attach(game_state)
+
+
+def disable():
+    for (cls, name), function in _originals.items():
+        if function is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, function)
+    _originals.clear()
+    for game_state in list(_attached):
+        attach(game_state)
+
+
+"""
+Rebind the per-piece move generators of an existing GameState to the current (instrumented or original) methods.
+"""
+
+
+def attach(game_state):
+    if isinstance(game_state, ChessEngine.GameState):
+        game_state.move_functions = {"P": game_state.getPawnMoves, "R": game_state.getRookMoves, "N": game_state.getKnightMoves,
+                                     "B": game_state.getBishopMoves, "Q": game_state.getQueenMoves, "K": game_state.getKingMoves}
+        _attached.add(game_state)
+
+
+def reset():
+    with _lock:
+        for stats in STATS.values():
+            stats[0] = 0
+            stats[1] = stats[2] = 0.0
+        FOLDED.clear()
+
+
+def _calls(counts, name):
+    return counts[name][0] if name in counts else 0
+
+
+"""
+Counters as a JSON friendly dict: per method calls, inclusive and self seconds and microseconds per call,
+the number of Move objects created and a few ratios per move generation. A move generation is either a full one
+(generateMoveCodes) or the start of a staged one (legalityContext, called once per node by stagedMoveCodes),
+so the ratios mean the same whether the work came from perft or from search.
+"""
+
+
+def snapshot():
+    with _lock:
+        counts = {name: list(stats) for name, stats in STATS.items()}
+    methods = {}
+    for name, (count, seconds, own) in sorted(counts.items()):
+        if count:
+            methods[name] = {"calls": count, "seconds": seconds, "self_seconds": own, "us_per_call": seconds / count * 1e6}
+    ratios = {}
+    for backend in ("GameState", "BitboardGameState"):
+        full = _calls(counts, backend + ".generateMoveCodes")
+        generations = full + _calls(counts, backend + ".legalityContext")
+        if generations:
+            for name in ("checkForPinsAndChecks", "squareUnderAttack", "squaresUnderAttack", "attackersTo", "pinnedPieces",
+                         "isLegalMove", "isPseudoLegal"):
+                if _calls(counts, backend + "." + name):
+                    ratios["%s.%s per move generation" % (backend, name)] = _calls(counts, backend + "." + name) / generations
+        lookups = _calls(counts, backend + ".getValidMoveCodes")
+        if lookups:
+            ratios[backend + " full generations per getValidMoveCodes"] = full / lookups
+    return {"time": time.time(), "enabled": enabled(), "move_objects": _calls(counts, "Move.setCode"),
+            "move_lists": _calls(counts, "MoveList.__init__"), "methods": methods, "ratios": ratios}
+
+
+def writeSnapshot(path):
+    with open(path, "w") as file:
+        json.dump(snapshot(), file, indent=2)
+
+
+"""
+Self time per stack of instrumented calls in folded format, one "a;b;c microseconds" line per stack.
+"""
+
+
+def writeFolded(path):
+    with _lock:
+        folded = sorted(FOLDED.items())
+    with open(path, "w") as file:
+        for stack, seconds in folded:
+            file.write("%s %d\n" % (stack, round(seconds * 1e6)))
+
+
+"""
+SIGUSR1 writes a snapshot to path, SIGUSR2 switches instrumentation on or off. Unix only, main thread only.
+"""
+
+
+def installSignalHandlers(path):
+    signal.signal(signal.SIGUSR1, lambda signum, frame: writeSnapshot(path))
+    signal.signal(signal.SIGUSR2, lambda signum, frame: disable() if enabled() else enable())
+
+
+def printSnapshot(stats, limit=25):
+    methods = sorted(stats["methods"].items(), key=lambda item: -item[1]["self_seconds"])
+    print("%-45s %10s %10s %10s %10s" % ("method", "calls", "total s", "self s", "us/call"))
+    for name, method in methods[:limit]:
+        print("%-45s %10d %10.3f %10.3f %10.2f" % (name, method["calls"], method["seconds"], method["self_seconds"],
+                                                   method["us_per_call"]))
+    print("Move objects created: %d, MoveLists: %d" % (stats["move_objects"], stats["move_lists"]))
+    for name, value in stats["ratios"].items():
+        print("%s: %.2f" % (name, value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a workload with the engine instrumented and report where time goes.")
+    parser.add_argument("--workload", choices=["perft", "search"], default="perft")
+    parser.add_argument("--backend", choices=sorted(ChessPerft.BACKENDS), default="string")
+    parser.add_argument("--fen", default=ChessPerft.POSITIONS[1][1], help="position to run (default: kiwipete)")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--json", help="write the snapshot as JSON to this file")
+    parser.add_argument("--folded", help="write folded stacks (for flamegraph.pl or speedscope) to this file")
+    parser.add_argument("--cprofile", help="run under cProfile instead and write the stats to this file (for snakeviz, flameprof, ...)")
+    args = parser.parse_args(argv)
+
+    game_state = ChessPerft.BACKENDS[args.backend]()
+    game_state.loadFen(args.fen)
+    if args.workload == "perft":
+        workload = lambda: ChessPerft.perft(game_state, args.depth)
+    else:
+        searcher = ChessAI.Searcher()
+        workload = lambda: searcher.search(game_state, args.depth)
+
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.runcall(workload)
+        print("%s depth %d in %.3fs under cProfile -> %s" % (args.workload, args.depth, time.perf_counter() - start, args.cprofile))
+        profiler.dump_stats(args.cprofile)
+        return 0
+
+    enable()
+    attach(game_state)
+    try:
+        start = time.perf_counter()
+        workload()
+        seconds = time.perf_counter() - start
+    finally:
+        disable()
+    stats = snapshot()
+    print("%s depth %d in %.3fs with instrumentation" % (args.workload, args.depth, seconds))
+    printSnapshot(stats)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(stats, file, indent=2)
+    if args.folded:
+        writeFolded(args.folded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
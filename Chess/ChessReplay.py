@@ -0,0 +1,198 @@
+"""
+Headless batch replay of recorded games, for using the engine as a validation stage without the pygame UI.
+Reads one game per line, replays it through GameState checking every move is legal,
+and writes one JSON result per game plus summary statistics (games/sec, plies/sec).
+Input is streamed line by line and only the game being replayed is kept in memory, so file size doesn't matter.
+
+A game line is a whitespace separated list of moves, either UCI long algebraic ("e2e4", "e7e8q")
+or SAN ("Nbd7", "exd6", "O-O", "e8=Q"), which includes the notation written by Move.getChessNotation
+("0-0", "e8Q", "dxe6 e.p."). For PGN files use ChessPgn.
+Move numbers ("12."), check markers ("+", "++") and results ("1-0", "0-1", "1/2-1/2", "*", "result: 1-0") are ignored.
+
+Usage (from the repository root):
+    python Chess/ChessReplay.py games.txt
+    python Chess/ChessReplay.py --format uci --quiet --progress 100000 games.txt
+    cat games.txt | python Chess/ChessReplay.py - > results.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+import ChessEngine
+import ChessPgn
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+MOVE_NUMBER = re.compile(r"^\d+\.+$")
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+
+"""
+Split a game line into move tokens, returns (tokens, result) where result is the game result token or None.
+"""
+
+
+def tokenize(line):
+    tokens = []
+    result = None
+    for token in line.split():
+        if token in RESULTS:
+            result = token
+        elif token == "result:" or token.startswith("e.p.") or MOVE_NUMBER.match(token):
+            continue
+        else:
+            if token[0].isdigit() and "." in token: # "12.e4" written without a space
+                token = token[token.rindex(".") + 1:]
+            token = token.rstrip("+#")
+            if token:
+                tokens.append(token)
+    return tokens, result
+
+
+"""
+Find the legal move matching a UCI token, returns the packed move int or None.
+"""
+
+
+def findUciMove(game_state, token):
+    move_id = ChessEngine.uciMoveId(token)
+    if move_id is None:
+        return None
+    for code in game_state.getValidMoveCodes():
+        if code & ChessEngine.MOVE_ID_MASK == move_id:
+            return code
+    return None
+
+
+"""
+Find the legal move written as token in SAN or in the notation of Move.getChessNotation (a subset of SAN).
+Returns (packed move int or None, error message or None).
+"""
+
+
+def findNotationMove(game_state, token):
+    try:
+        return ChessPgn.parseSan(game_state, token), None
+    except ValueError as error:
+        return None, str(error)
+
+
+"""
+Replay one game from the start position.
+Returns a result dict: plies replayed, whether every move was legal, the first bad move and the final position status.
+"""
+
+
+def replayGame(game_state, tokens, move_format="auto"):
+    error = None
+    bad_move = None
+    for token in tokens:
+        use_uci = move_format == "uci" or (move_format == "auto" and ChessEngine.uciMoveId(token) is not None)
+        if use_uci:
+            code = findUciMove(game_state, token)
+            if code is None:
+                error = "illegal move"
+        else:
+            code, error = findNotationMove(game_state, token)
+        if code is None:
+            bad_move = token
+            break
+        game_state.makeMove(code)
+
+    status = "ongoing"
+    draw_reason = None
+    if error is None:
+        game_state.getValidMoveCodes() # sets checkmate / stalemate / draw for the final position
+        if game_state.checkmate:
+            status = "checkmate"
+        elif game_state.stalemate:
+            status = "stalemate"
+        elif game_state.draw:
+            status = "draw"
+            draw_reason = game_state.draw_reason
+    return {
+        "plies": len(game_state.move_log),
+        "ok": error is None,
+        "error": error,
+        "bad_move": bad_move,
+        "status": status,
+        "draw_reason": draw_reason,
+        "white_to_move": game_state.white_to_move,
+    }
+
+
+"""
+Replay every game in the lines iterable, yields one result dict per non-empty line.
+"""
+
+
+def replayGames(lines, move_format="auto"):
+    game_state = ChessEngine.GameState(START_FEN)
+    start = game_state.snapshot()
+    game = 0
+    for line_number, line in enumerate(lines, 1):
+        tokens, result = tokenize(line)
+        if not tokens and result is None:
+            continue
+        game += 1
+        game_state.restore(start)
+        replay = replayGame(game_state, tokens, move_format)
+        replay["game"] = game
+        replay["line"] = line_number
+        replay["result"] = result
+        yield replay
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded games through the engine and check every move is legal.")
+    parser.add_argument("input", help="file with one game per line, - for stdin")
+    parser.add_argument("--format", choices=["auto", "uci", "notation"], default="auto",
+                        help="move format, auto picks UCI for tokens that look like e2e4 and notation otherwise")
+    parser.add_argument("--output", help="write the per game JSON lines to this file instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--errors-only", action="store_true", help="only write results for games with an illegal move")
+    parser.add_argument("--limit", type=int, help="stop after this many games")
+    parser.add_argument("--progress", type=int, help="print a progress line to stderr every N games")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", errors="replace")
+    output = None if args.quiet else sys.stdout if args.output is None else open(args.output, "w")
+
+    games = 0
+    failed = 0
+    plies = 0
+    statuses = {"checkmate": 0, "stalemate": 0, "draw": 0, "ongoing": 0}
+    start = time.perf_counter()
+    try:
+        for replay in replayGames(source, args.format):
+            games += 1
+            plies += replay["plies"]
+            if replay["ok"]:
+                statuses[replay["status"]] += 1
+            else:
+                failed += 1
+            if output is not None and (not args.errors_only or not replay["ok"]):
+                output.write(json.dumps(replay) + "\n")
+            if args.progress and games % args.progress == 0:
+                seconds = time.perf_counter() - start
+                print("%d games, %d failed, %.1f games/sec" % (games, failed, games / seconds if seconds > 0 else 0.0), file=sys.stderr)
+            if args.limit is not None and games >= args.limit:
+                break
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not None and output is not sys.stdout:
+            output.close()
+
+    seconds = time.perf_counter() - start
+    print("%d games (%d ok, %d failed), %d plies, %d checkmate, %d stalemate, %d draw, %d unfinished in %.3fs (%.1f games/sec, %.0f plies/sec)" % (
+        games, games - failed, failed, plies, statuses["checkmate"], statuses["stalemate"], statuses["draw"], statuses["ongoing"], seconds,
+        games / seconds if seconds > 0 else 0.0, plies / seconds if seconds > 0 else 0.0), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
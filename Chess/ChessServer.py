@@ -0,0 +1,444 @@
+"""
+asyncio server hosting many games at once over a TCP or Unix socket, plus a load-test client.
+The protocol is JSON lines: every request is one JSON object with an "op" and the reply echoes its "id".
+    {"op": "new", "fen": optional}                        -> {"session": id, "fen": ..., "status": ...}
+    {"op": "moves", "session": id}                        -> {"moves": ["e2e4", ...]}
+    {"op": "move", "session": id, "move": "e2e4"}         -> {"fen": ..., "status": ..., "draw_reason": ...}
+    {"op": "status", "session": id}                       -> {"fen": ..., "status": ..., "plies": ...}
+    {"op": "search", "session": id, "depth": 3, "movetime": ms, "play": false} -> {"bestmove": ..., "score": ...}
+    {"op": "close", "session": id}
+    {"op": "stats"}                                       -> sessions, estimated memory, evictions, requests
+Errors are replied as {"ok": false, "error": "..."}.
+
+Legal move generation and search run in a worker pool (processes by default) so the event loop only parses requests
+and applies moves. Workers get a GameState.snapshot() of the position, never the GameState itself.
+The legal moves of each session's current position are computed once after every move and cached,
+so "moves" and the legality check of the next "move" don't need the pool.
+Sessions idle for longer than --idle-timeout are evicted, and memory per session is estimated from the game length.
+
+Usage (from the repository root):
+    python Chess/ChessServer.py serve --port 8765 --workers 4
+    python Chess/ChessServer.py serve --pool thread --profile-snapshot stats.json   (then kill -USR2 / -USR1 <pid>)
+    python Chess/ChessServer.py load --port 8765 --clients 100 --games 2 --moves 40
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import ChessEngine
+import ChessAI
+import ChessProfile
+
+
+DEFAULT_PORT = 8765
+SEARCH_TABLE_SIZE = 1 << 16 # transposition table entries of each worker's searcher
+MAX_SEARCH_TIME = 10 # seconds, upper bound for the movetime a client can ask for
+
+_worker = threading.local() # per worker (process or thread) GameState and Searcher, reused between tasks
+
+
+def _workerState():
+    if not hasattr(_worker, "game_state"):
+        _worker.game_state = ChessEngine.GameState()
+        _worker.searcher = ChessAI.Searcher(SEARCH_TABLE_SIZE)
+    return _worker.game_state, _worker.searcher
+
+
+"""
+Worker task: legal move codes of a position and whether the side to move is in check.
+"""
+
+
+def legalMovesTask(snapshot):
+    game_state, searcher = _workerState()
+    game_state.restore(snapshot)
+    codes = game_state.getValidMoveCodes()
+    return codes, game_state.in_check
+
+
+"""
+Worker task: search a position, returns (best move code or None, score, depth, nodes).
+The snapshot has no move history, so repetitions before the position are not seen by the search.
+"""
+
+
+def searchTask(snapshot, depth, time_limit):
+    game_state, searcher = _workerState()
+    game_state.restore(snapshot)
+    info = searcher.search(game_state, depth, time_limit)
+    return (info.best_move.move_code if info.best_move is not None else None), info.score, info.depth, info.nodes
+
+
+class ClientError(Exception):
+    pass
+
+
+class Session():
+    def __init__(self, session_id, game_state, now):
+        self.session_id = session_id
+        self.game_state = game_state
+        self.legal_codes = None # legal moves of the current position, filled in by the worker pool
+        self.in_check = False
+        self.last_used = now
+        self.lock = asyncio.Lock() # requests on the same session are handled one at a time
+
+
+    def status(self):
+        if not self.legal_codes:
+            return "checkmate" if self.in_check else "stalemate"
+        if self.game_state.getDrawReason() is not None:
+            return "draw"
+        return "ongoing"
+
+
+"""
+Memory estimate of a session: a fixed part plus a part per ply played, both measured once on a real GameState
+(see measureSessionMemory), so accounting stays O(1) per request.
+"""
+
+
+def _deepSize(game_state):
+    size = sys.getsizeof(game_state) + sys.getsizeof(vars(game_state))
+    size += sys.getsizeof(game_state.board) + sum(sys.getsizeof(row) for row in game_state.board)
+    for log in (game_state.move_log, game_state.zobrist_log, game_state.enpassant_possible_log, game_state.castle_rights_log,
+                game_state.halfmove_clock_log):
+        size += sys.getsizeof(log)
+    size += sum(sys.getsizeof(value) for value in game_state.move_log)
+    size += sum(sys.getsizeof(value) for value in game_state.zobrist_log)
+    size += sum(sys.getsizeof(rights) + sys.getsizeof(vars(rights)) for rights in set(game_state.castle_rights_log))
+    size += sys.getsizeof(game_state.repetition_counts) + sys.getsizeof(game_state.piece_counts)
+    return size
+
+
+def measureSessionMemory(plies=40):
+    game_state = ChessEngine.GameState()
+    base = _deepSize(game_state)
+    for ply in range(plies):
+        moves = game_state.getValidMoveCodes()
+        if not moves:
+            break
+        game_state.makeMove(moves[ply % len(moves)])
+    per_ply = (_deepSize(game_state) - base) / max(1, len(game_state.move_log))
+    return base, per_ply
+
+
+class GameServer():
+    def __init__(self, executor, idle_timeout=300, max_sessions=10000):
+        self.executor = executor
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.next_session = 1
+        self.evicted = 0
+        self.requests = 0
+        self.session_base_bytes, self.session_ply_bytes = measureSessionMemory()
+        self.handlers = {"new": self.newGame, "moves": self.legalMoves, "move": self.makeMove, "status": self.gameStatus,
+                         "search": self.search, "close": self.closeGame, "stats": self.stats}
+
+
+    """
+    Run a task in the worker pool. A failing task (or a broken pool) is reported to the client as a ClientError.
+    """
+
+
+    async def runInPool(self, function, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        except Exception as error:
+            raise ClientError("engine error: %s" % (error.__class__.__name__,))
+
+
+    async def refreshLegalMoves(self, session):
+        session.legal_codes, session.in_check = await self.runInPool(legalMovesTask, session.game_state.snapshot())
+
+
+    """
+    Refresh the legal moves after a move was made, taking the move back if that fails so the session stays usable.
+    """
+
+
+    async def refreshAfterMove(self, session):
+        try:
+            await self.refreshLegalMoves(session)
+        except ClientError:
+            session.game_state.undoMove()
+            raise
+
+
+    def getSession(self, request):
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ClientError("unknown session")
+        session.last_used = time.monotonic()
+        return session
+
+
+    def describe(self, session):
+        game_state = session.game_state
+        return {"session": session.session_id, "fen": game_state.getFen(), "status": session.status(),
+                "draw_reason": game_state.getDrawReason() if session.legal_codes else None,
+                "white_to_move": game_state.white_to_move, "plies": len(game_state.move_log)}
+
+
+    async def newGame(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise ClientError("too many sessions")
+        fen = request.get("fen")
+        if fen is not None and not isinstance(fen, str):
+            raise ClientError("invalid fen")
+        try:
+            game_state = ChessEngine.GameState(fen) # parseFen rejects boards the engine can't play from
+        except ValueError as error:
+            raise ClientError(str(error))
+        # the side that just moved can't have left its king in check, or the king could be taken
+        game_state.white_to_move = not game_state.white_to_move
+        king_attacked = game_state.inCheck()
+        game_state.white_to_move = not game_state.white_to_move
+        if king_attacked:
+            raise ClientError("invalid fen: the side not to move is in check")
+        session = Session(str(self.next_session), game_state, time.monotonic())
+        self.next_session += 1
+        # the session is only registered once its legal moves are known, a failed refresh leaves nothing behind
+        await self.refreshLegalMoves(session)
+        self.sessions[session.session_id] = session
+        return self.describe(session)
+
+
+    async def legalMoves(self, request):
+        session = self.getSession(request)
+        async with session.lock:
+            return {"moves": [ChessEngine.Move.fromCode(code).getUciNotation() for code in session.legal_codes]}
+
+
+    async def makeMove(self, request):
+        session = self.getSession(request)
+        async with session.lock:
+            move_id = ChessEngine.uciMoveId(str(request.get("move", "")))
+            code = None
+            if move_id is not None:
+                for legal_code in session.legal_codes:
+                    if legal_code & ChessEngine.MOVE_ID_MASK == move_id:
+                        code = legal_code
+                        break
+            if code is None:
+                raise ClientError("illegal move")
+            session.game_state.makeMove(code)
+            await self.refreshAfterMove(session)
+            return self.describe(session)
+
+
+    async def gameStatus(self, request):
+        session = self.getSession(request)
+        async with session.lock:
+            return self.describe(session)
+
+
+    async def search(self, request):
+        session = self.getSession(request)
+        async with session.lock:
+            depth = request.get("depth", ChessAI.MAX_PLY)
+            if type(depth) is not int or not 1 <= depth <= ChessAI.MAX_PLY:
+                raise ClientError("depth must be an integer from 1 to %d" % ChessAI.MAX_PLY)
+            movetime = request.get("movetime", 1000)
+            if type(movetime) not in (int, float) or not movetime > 0:
+                raise ClientError("movetime must be a positive number of milliseconds")
+            time_limit = min(movetime / 1000, MAX_SEARCH_TIME)
+            code, score, depth, nodes = await self.runInPool(searchTask, session.game_state.snapshot(), depth, time_limit)
+            reply = {"bestmove": ChessEngine.Move.fromCode(code).getUciNotation() if code is not None else None,
+                     "score": score, "depth": depth, "nodes": nodes}
+            if request.get("play") and code is not None:
+                session.game_state.makeMove(code)
+                await self.refreshAfterMove(session)
+                reply.update(self.describe(session))
+            return reply
+
+
+    async def closeGame(self, request):
+        session = self.getSession(request)
+        del self.sessions[session.session_id]
+        return {}
+
+
+    def sessionMemory(self, session):
+        return int(self.session_base_bytes + self.session_ply_bytes * len(session.game_state.move_log))
+
+
+    async def stats(self, request):
+        memory = sum(self.sessionMemory(session) for session in self.sessions.values())
+        return {"sessions": len(self.sessions), "memory_bytes": memory,
+                "memory_per_session": memory // len(self.sessions) if self.sessions else 0,
+                "evicted": self.evicted, "requests": self.requests}
+
+
+    async def handleRequest(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "invalid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be a JSON object"}
+        self.requests += 1
+        handler = self.handlers.get(request.get("op"))
+        try:
+            if handler is None:
+                raise ClientError("unknown op")
+            reply = await handler(request)
+            reply["ok"] = True
+        except ClientError as error:
+            reply = {"ok": False, "error": str(error)}
+        except Exception as error: # a bug in one request must not drop the connection
+            reply = {"ok": False, "error": "internal error: %s" % (error.__class__.__name__,)}
+        if "id" in request:
+            reply["id"] = request["id"]
+        return reply
+
+
+    async def handleConnection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                reply = await self.handleRequest(line)
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+    """
+    Periodically drop sessions nobody has used for idle_timeout seconds.
+    """
+
+
+    async def evictIdleSessions(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id in [session_id for session_id, session in self.sessions.items()
+                               if session.last_used < cutoff and not session.lock.locked()]:
+                del self.sessions[session_id]
+                self.evicted += 1
+
+
+async def serve(args):
+    if args.pool == "thread":
+        executor = concurrent.futures.ThreadPoolExecutor(args.workers)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(args.workers)
+    server = GameServer(executor, args.idle_timeout, args.max_sessions)
+    if args.profile_snapshot:
+        ChessProfile.installSignalHandlers(args.profile_snapshot)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handleConnection, path=args.unix)
+        where = args.unix
+    else:
+        listener = await asyncio.start_server(server.handleConnection, args.host, args.port)
+        where = "%s:%d" % (args.host, args.port)
+    print("serving on %s with %d %s workers" % (where, args.workers, args.pool), file=sys.stderr)
+    eviction = asyncio.create_task(server.evictIdleSessions())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        eviction.cancel()
+        executor.shutdown(cancel_futures=True)
+
+
+"""
+Load test: clients connections each play games of random legal moves and time every "move" request.
+"""
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def loadTest(args):
+    latencies = []
+    errors = []
+
+    async def client(index):
+        if args.unix:
+            reader, writer = await asyncio.open_unix_connection(args.unix)
+        else:
+            reader, writer = await asyncio.open_connection(args.host, args.port)
+        rng = random.Random(index)
+
+        async def request(message):
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            if not reply.get("ok"):
+                errors.append(reply.get("error"))
+            return reply
+
+        for game in range(args.games):
+            session = (await request({"op": "new"})).get("session")
+            for ply in range(args.moves):
+                moves = (await request({"op": "moves", "session": session})).get("moves")
+                if not moves:
+                    break
+                start = time.perf_counter()
+                reply = await request({"op": "move", "session": session, "move": rng.choice(moves)})
+                latencies.append(time.perf_counter() - start)
+                if reply.get("status") != "ongoing":
+                    break
+            await request({"op": "close", "session": session})
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(args.clients)))
+    seconds = time.perf_counter() - start
+    print("%d clients, %d moves in %.3fs (%.1f moves/sec), %d errors" % (
+        args.clients, len(latencies), seconds, len(latencies) / seconds if seconds > 0 else 0.0, len(errors)))
+    print("move latency p50 %.2fms  p99 %.2fms  max %.2fms" % (
+        percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, max(latencies, default=0.0) * 1000))
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-game JSON lines server and load-test client.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "load"):
+        command = commands.add_parser(name)
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+        command.add_argument("--unix", help="use this Unix socket path instead of TCP")
+        if name == "serve":
+            command.add_argument("--workers", type=int, default=os.cpu_count(), help="worker pool size")
+            command.add_argument("--pool", choices=["process", "thread"], default="process")
+            command.add_argument("--idle-timeout", type=float, default=300, help="seconds before an unused session is evicted")
+            command.add_argument("--max-sessions", type=int, default=10000)
+            command.add_argument("--profile-snapshot", help="kill -USR2 toggles engine instrumentation, kill -USR1 writes a "
+                                 "JSON snapshot to this file (only covers the workers with --pool thread)")
+        else:
+            command.add_argument("--clients", type=int, default=50, help="concurrent connections")
+            command.add_argument("--games", type=int, default=1, help="games per client")
+            command.add_argument("--moves", type=int, default=40, help="maximum plies per game")
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    return asyncio.run(loadTest(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+UCI (Universal Chess Interface) front end, so the engine can be used by GUIs and tournament managers such as cutechess.
+Reads commands from stdin and answers on stdout. The search runs on a background thread,
+so "stop", "isready" and "quit" are answered while it is thinking.
+
+Supported commands: uci, isready, ucinewgame, setoption name Hash|BookFile|OwnBook value <value>, position startpos|fen <fen> [moves ...],
+go [depth N] [movetime ms] [nodes N] [wtime ms btime ms winc ms binc ms movestogo N] [infinite], stop, quit.
+
+Usage (from the repository root):
+    python Chess/ChessUci.py
+"""
+
+import sys
+import threading
+
+import ChessEngine
+import ChessAI
+import ChessBook
+
+
+ENGINE_NAME = "ChessEngine"
+ENGINE_AUTHOR = "alejxung"
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+DEFAULT_HASH_MB = 16
+TABLE_ENTRY_BYTES = 64 # rough size of one transposition table entry, used to turn the Hash option into a table size
+MOVES_TO_GO = 30 # assumed number of moves left when the GUI doesn't say
+
+
+"""
+Score in UCI form: "cp <centipawns>" or "mate <moves>" (negative when the engine is getting mated).
+"""
+
+
+def uciScore(score):
+    if score >= ChessAI.CHECKMATE - ChessAI.MAX_PLY:
+        return "mate %d" % ((ChessAI.CHECKMATE - score + 1) // 2)
+    if score <= -ChessAI.CHECKMATE + ChessAI.MAX_PLY:
+        return "mate %d" % -((ChessAI.CHECKMATE + score) // 2)
+    return "cp %d" % score
+
+
+class UciEngine():
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock() # the search thread writes info and bestmove lines too
+        self.game_state = ChessEngine.GameState()
+        self.searcher = ChessAI.Searcher(self.tableSize(DEFAULT_HASH_MB))
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        self.book = None # ChessBook.OpeningBook set with the BookFile option
+        self.own_book = True
+
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+
+    def tableSize(self, megabytes):
+        return max(1024, megabytes * 1024 * 1024 // TABLE_ENTRY_BYTES)
+
+
+    """
+    Handle one command line, returns False when the engine should exit.
+    """
+
+
+    def handleCommand(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == "uci":
+            self.send("id name " + ENGINE_NAME)
+            self.send("id author " + ENGINE_AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max 1024" % DEFAULT_HASH_MB)
+            self.send("option name OwnBook type check default true")
+            self.send("option name BookFile type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stopSearch()
+            self.searcher.clear()
+            self.game_state = ChessEngine.GameState()
+        elif command == "setoption":
+            self.setOption(tokens[1:])
+        elif command == "position":
+            self.stopSearch()
+            self.setPosition(tokens[1:])
+        elif command == "go":
+            self.stopSearch()
+            self.startSearch(tokens[1:])
+        elif command == "stop":
+            self.stopSearch()
+        elif command == "quit":
+            self.stopSearch()
+            return False
+        # debug, ponderhit, register and unknown commands are ignored as the protocol asks
+        return True
+
+
+    def setOption(self, tokens):
+        if "name" not in tokens or "value" not in tokens:
+            return
+        name = " ".join(tokens[tokens.index("name") + 1:tokens.index("value")])
+        value = " ".join(tokens[tokens.index("value") + 1:])
+        if name.lower() == "hash" and value.isdigit():
+            self.stopSearch()
+            self.searcher = ChessAI.Searcher(self.tableSize(int(value)))
+        elif name.lower() == "ownbook":
+            self.own_book = value.lower() == "true"
+        elif name.lower() == "bookfile":
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value and value != "<empty>":
+                try:
+                    self.book = ChessBook.OpeningBook(value)
+                except OSError as error:
+                    self.send("info string cannot open book %s: %s" % (value, error))
+
+
+    """
+    position startpos [moves ...] / position fen <6 fields> [moves ...]
+    An illegal move stops the move list there, the position keeps the moves before it.
+    An invalid FEN or a move that isn't UCI notation at all leaves the previous position as it was.
+    """
+
+
+    def setPosition(self, tokens):
+        if not tokens:
+            return
+        moves = tokens.index("moves") if "moves" in tokens else len(tokens)
+        if tokens[0] == "startpos":
+            fen = START_FEN
+        elif tokens[0] == "fen":
+            fen = " ".join(tokens[1:moves])
+        else:
+            return
+        try:
+            game_state = ChessEngine.GameState(fen)
+        except ValueError as error:
+            self.send("info string %s" % error)
+            return
+        for text in tokens[moves + 1:]:
+            if ChessEngine.uciMoveId(text) is None:
+                self.send("info string invalid move " + text)
+                return
+        for text in tokens[moves + 1:]:
+            move = game_state.getValidMoves().by_id.get(ChessEngine.uciMoveId(text))
+            if move is None:
+                self.send("info string illegal move " + text)
+                break
+            game_state.makeMove(move)
+        self.game_state = game_state
+
+
+    """
+    Start searching the current position on a background thread with the limits of a go command.
+    A book move is played straight away, without searching, unless the search is infinite.
+    """
+
+
+    def startSearch(self, tokens):
+        options = {}
+        i = 0
+        while i < len(tokens):
+            if tokens[i] == "infinite":
+                options["infinite"] = True
+                i += 1
+            elif i + 1 < len(tokens) and tokens[i + 1].lstrip("-").isdigit():
+                options[tokens[i]] = int(tokens[i + 1])
+                i += 2
+            else:
+                i += 1
+
+        max_depth = options.get("depth", ChessAI.MAX_PLY)
+        node_limit = options.get("nodes")
+        time_limit = None
+        if "movetime" in options:
+            time_limit = options["movetime"] / 1000
+        elif not options.get("infinite"):
+            remaining = options.get("wtime" if self.game_state.white_to_move else "btime")
+            increment = options.get("winc" if self.game_state.white_to_move else "binc", 0)
+            if remaining is not None:
+                time_limit = max(0.01, (remaining / options.get("movestogo", MOVES_TO_GO) + increment / 2) / 1000)
+                time_limit = min(time_limit, remaining / 1000 / 2)
+
+        if self.book is not None and self.own_book and not options.get("infinite"):
+            move = self.book.chooseMove(self.game_state)
+            if move is not None:
+                self.send("info string book move")
+                self.send("bestmove " + move.getUciNotation())
+                return
+
+        self.stop_event.clear()
+        self.searcher.stop_requested = False # a stop sent after the previous search ended must not cancel this one
+        self.search_thread = threading.Thread(target=self.search, args=(self.game_state, max_depth, time_limit, node_limit,
+                                                                         options.get("infinite", False)), daemon=True)
+        self.search_thread.start()
+
+
+    def search(self, game_state, max_depth, time_limit, node_limit, infinite):
+        info = self.searcher.search(game_state, max_depth, time_limit, node_limit, callback=self.sendInfo)
+        if infinite: # "go infinite" only answers after "stop", even if the search ended on its own
+            self.stop_event.wait()
+        self.send("bestmove " + (info.best_move.getUciNotation() if info.best_move is not None else "0000"))
+
+
+    def sendInfo(self, info):
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" % (
+            info.depth, uciScore(info.score), info.nodes, info.nps, int(info.seconds * 1000),
+            " ".join(move.getUciNotation() for move in info.pv)))
+
+
+    """
+    Stop a running search and wait for it to send its bestmove.
+    """
+
+
+    def stopSearch(self):
+        if self.search_thread is not None:
+            self.searcher.stop()
+            self.stop_event.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+
+def main():
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handleCommand(line):
+            break
+    engine.stopSearch()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())